@@ -0,0 +1,79 @@
+"""Analyzes the sentiment of tweets by state and zip code.
+
+The work is split between modules that can be imported on their own:
+
+    parser    -- reading lines of tweets
+    geocoder  -- finding the zip code and state of tweets
+    scoring   -- sentiment lexicons and scoring tweets with them
+    query     -- indexes, filters and sentiment statistics
+    table     -- columnar storage of tweets
+    pipeline  -- analyzing whole files, with caching and worker processes
+    cli       -- the command line, also run by python -m TweetAnalyzer
+    gui       -- the Tkinter window, run by GUI.py
+
+Everything the modules other than gui define is also available from the
+package itself, but a module is only imported the first time one of its
+names is used, so a worker that only parses and geocodes never loads the
+scoring code, NumPy or Tkinter.
+
+TweetAnalyzer needs Python 3.7 or later. The zip code cache is read
+through memoryview.cast, and the package loads its modules with a module
+level __getattr__.
+
+"""
+import importlib
+import sys
+
+if sys.version_info < (3, 7):
+    raise ImportError("TweetAnalyzer needs Python 3.7 or later")
+
+# The module each name of the package is defined in
+_modules = {}
+for _module, _names in [
+    ("parser", ("make_tweet", "TWEET_TIME", "parse_tweet", "tweet_text", "WORD_BYTES", "split_words",
+                "add_words", "tweet_words", "tweet_time", "timestamp", "parse_time", "tweet_location")),
+    ("table", ("EPOCH", "HAS_GEO", "HAS_SENTIMENT", "INT_SENTIMENT", "TweetRow", "TweetTable",
+               "make_tweet_table", "TABLE_HEADER", "TABLE_MAGIC", "TABLE_VERSION", "TABLE_COLUMNS",
+               "TABLE_NAMES", "write_tweet_table", "read_tweet_table")),
+    ("geocoder", ("make_zip", "find_zip", "sphere_point", "ZipIndex", "CUTOFF_MILES", "EARTH_RADIUS_MILES",
+                  "ZipGrid", "Gazetteer", "GAZETTEER_HEADER", "GAZETTEER_MAGIC", "GAZETTEER_VERSION",
+                  "read_gazetteer_csv", "write_gazetteer_cache", "read_gazetteer_cache", "load_gazetteer",
+                  "geo_distance", "find_zips_numpy", "GeoMemo", "add_geo", "ZIPS_FILE")),
+    ("scoring", ("create_sentiment_database", "NOT_WORD", "PHRASE_END", "SentimentLexicon", "SortedTerms",
+                 "compile_sentiments", "LEXICON_HEADER", "LEXICON_MAGIC", "LEXICON_VERSION",
+                 "write_lexicon_cache", "read_lexicon_cache", "load_sentiments", "sum_sentiments_numpy",
+                 "clamp_sentiments_numpy", "assign_sentiments_numpy", "assign_table_sentiments_numpy",
+                 "assign_sentiments", "scoring_throughput")),
+    ("query", ("WordIndex", "TimeIndex", "IndexedTweets", "index_tweets", "find_tweets_containing",
+               "find_tweets_containing_all", "find_tweets_containing_any", "find_tweets_from_state",
+               "find_tweets_from_zip", "find_tweets_between", "tweet_filter", "find_average_sentiment",
+               "create_state_database", "group_sentiments", "rank_sentiments", "group_sentiment_stats",
+               "top_sentiments", "BUCKETS", "group_sentiments_by_time", "sentiment_trend", "most_positive",
+               "most_negative", "STATES_FILE")),
+    ("pipeline", ("write_tweets", "read_tweets", "chunk_tweets", "ResultsCache", "default_cache_directory",
+                  "AnalysisCancelled", "count_lines", "PipelineStats", "StageTimer", "NullStats", "NullStage",
+                  "NULL_STATS", "NULL_STAGE", "count_results", "analyze_tweets", "AnalyzedCorpus", "split_file",
+                  "read_range", "analyze_file")),
+    ("cli", ("open_tweets", "command_line_parser", "analyze_command", "rank_command", "trend_command",
+             "main")),
+    ("optional", ("load_numpy",)),
+]:
+    for _name in _names:
+        _modules[_name] = _module
+del _module, _names, _name
+
+__all__ = sorted(_modules)
+
+
+def __getattr__(name):
+    """Import the module that defines name the first time it is used"""
+    if name not in _modules:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    value = getattr(importlib.import_module("." + _modules[name], __name__), name)
+    # Later lookups find it without coming back here
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_modules))
@@ -0,0 +1,257 @@
+"""Command line of TweetAnalyzer, run with python -m TweetAnalyzer"""
+import os
+import sys
+import argparse
+import logging
+
+from .parser import parse_time
+from .table import TweetTable, write_tweet_table
+from .geocoder import GeoMemo, load_gazetteer
+from .scoring import load_sentiments
+from .query import BUCKETS, STATES_FILE, create_state_database, index_tweets, sentiment_trend, top_sentiments
+from .pipeline import NULL_STATS, PipelineStats, ResultsCache, analyze_file, analyze_tweets, write_tweets
+
+
+def open_tweets(name):
+    """Return the open file of tweets called name, or standard input for -"""
+    if name == "-":
+        return sys.stdin
+    return open(name, 'r')
+
+
+def command_line_parser():
+    """Return the argparse parser for the command line"""
+    parser = argparse.ArgumentParser(
+        prog="python -m TweetAnalyzer",
+        description="Add zip codes, states and sentiments to files of tweets, or rank states by sentiment. "
+                    "The zip codes and the sentiment file are only loaded once however many files are given.")
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+    analyze = commands.add_parser("analyze", help="write the analyzed tweets")
+    rank = commands.add_parser("rank", help="rank states or zip codes by their sentiment about a word")
+    rank.add_argument("rank_word", metavar="word", help="word to rank the sentiment about")
+    trend = commands.add_parser("trend", help="average sentiment about a word of each state or zip code "
+                                              "in each hour, day or week")
+    trend.add_argument("rank_word", metavar="word", help="word to follow the sentiment about")
+    for command in (analyze, rank, trend):
+        command.add_argument("tweets", nargs="*",
+                             help="files of tweets formatted as in all_tweets.txt, - or none for standard input")
+        command.add_argument("-s", "--sentiments", required=True,
+                             help="csv file of words and sentiment values")
+        command.add_argument("--state", help="only keep tweets from this state")
+        command.add_argument("--zip", help="only keep tweets from this zip code")
+        command.add_argument("--word", help="only keep tweets containing this word")
+        command.add_argument("--since", type=parse_time,
+                             help="only keep tweets posted from this time on, YYYY-MM-DD or "
+                                  "\"YYYY-MM-DD HH:MM:SS\" in UTC")
+        command.add_argument("--until", type=parse_time,
+                             help="only keep tweets posted before this time")
+        command.add_argument("--engine", default="index", choices=["index", "grid", "numpy", "brute"],
+                             help="how the closest zip code is found")
+        command.add_argument("--chunk-size", type=int, default=10000,
+                             help="number of tweets analyzed at a time")
+        command.add_argument("--cache-dir",
+                             help="keep analyzed chunks of tweets in this directory and reuse them")
+        command.add_argument("--cache-size", type=int,
+                             help="most megabytes the cache may use, the least recently used chunks are "
+                                  "removed first")
+        command.add_argument("--geo-memo", type=int, default=100000,
+                             help="remember the zip codes of this many recent locations, 0 to look every tweet up")
+        command.add_argument("--geo-precision", type=int,
+                             help="round coordinates to this many decimal places for --geo-memo, by default "
+                                  "only exactly equal coordinates share a zip code")
+        command.add_argument("--stats", action="store_true",
+                             help="log the time spent in each stage and counts of the tweets to standard error "
+                                  "as JSON lines")
+    analyze.add_argument("-o", "--output", default="-",
+                         help="file to write the analyzed tweets of every input to, - for standard output")
+    analyze.add_argument("--output-dir",
+                         help="write the tweets of each input to a file of the same name in this directory")
+    analyze.add_argument("--format", default="text", choices=["text", "table"],
+                         help="write one tweet dictionary per line or a binary tweet table file")
+    analyze.add_argument("--workers", type=int, default=1,
+                         help="number of processes to use for each input file, 0 for one per CPU. Needs "
+                              "--output-dir, or -o with a single input file")
+    for command in (rank, trend):
+        command.add_argument("--by", default="state", choices=["state", "zip"],
+                             help="rank states or zip codes")
+    rank.add_argument("--top", type=int,
+                      help="only write this many of the most positive and most negative, each line starting with "
+                           "top or bottom")
+    rank.add_argument("--min-count", type=int, default=1,
+                      help="leave out states or zip codes with fewer tweets with a sentiment than this")
+    trend.add_argument("--bucket", default="day", choices=sorted(BUCKETS),
+                       help="length of time each average is taken over")
+    return parser
+
+
+def analyze_command(args, sentiments, cache, filters, stats=None, memo=None):
+    """Run the analyze command, returns the number of tweets written"""
+    counts = {}
+    if stats is not None:
+        counts = stats.counters
+    total = 0
+    table = None
+    out = None
+    if args.output_dir is None and args.output != "-" and args.tweets != ["-"] and len(args.tweets) == 1:
+        # A single file written to a file can be split between workers
+        total = analyze_file(args.tweets[0], sentiments, args.output, args.chunk_size, args.engine, counts,
+                             args.workers or None, args.format, cache, None, stats, memo, **filters)
+        sys.stderr.write("%d tweets written, %d malformed lines skipped\n" % (total, counts.get("malformed", 0)))
+        return total
+    if args.output_dir is None:
+        # Every input goes to the same output, a table can only be written
+        # once so it is collected first
+        if args.format == "table":
+            table = TweetTable()
+        elif args.output == "-":
+            out = sys.stdout
+        else:
+            out = open(args.output, 'w')
+    try:
+        for name in args.tweets:
+            if args.output_dir is not None:
+                outfile = os.path.join(args.output_dir, os.path.basename(name))
+                if name != "-":
+                    total += analyze_file(name, sentiments, outfile, args.chunk_size, args.engine, counts,
+                                          args.workers or None, args.format, cache, None, stats, memo,
+                                          **filters)
+                    continue
+                out = outfile
+            f = open_tweets(name)
+            try:
+                tweets = analyze_tweets(f, sentiments, args.chunk_size, args.engine, counts, cache, None, stats,
+                                        memo, **filters)
+                if table is not None:
+                    table.extend(tweets)
+                else:
+                    total += write_tweets(tweets, out, args.format)
+            finally:
+                if f is not sys.stdin:
+                    f.close()
+        if table is not None:
+            if args.output == "-":
+                total += write_tweet_table(table, sys.stdout.buffer)
+            else:
+                total += write_tweet_table(table, args.output)
+    finally:
+        if out is not None and hasattr(out, "write") and out is not sys.stdout:
+            out.close()
+    sys.stderr.write("%d tweets written, %d malformed lines skipped\n" % (total, counts.get("malformed", 0)))
+    return total
+
+
+def rank_command(args, sentiments, cache, filters, stats=None, memo=None):
+    """Run the rank command, writing one tab separated line per state or zip
+    code: the input file if there is more than one, the state or zip code, the
+    average sentiment of the tweets with one, the number of tweets with a
+    sentiment and the number of tweets. With --top only the most positive and
+    most negative are written, after top or bottom"""
+    groups = None
+    if args.by == "state":
+        groups = create_state_database(STATES_FILE)
+    if stats is None:
+        stats = NULL_STATS
+    for name in args.tweets:
+        f = open_tweets(name)
+        try:
+            tweets = TweetTable(analyze_tweets(f, sentiments, args.chunk_size, args.engine, None, cache, None,
+                                               stats if stats.enabled else None, memo, **filters))
+        finally:
+            if f is not sys.stdin:
+                f.close()
+        with stats.stage("word_index", len(tweets)):
+            tweets = index_tweets(tweets)
+        with stats.stage("rank", len(tweets)):
+            top, bottom = top_sentiments(tweets, args.top, args.rank_word, args.by, args.min_count, groups)
+        rows = [("top", row) for row in top]
+        if args.top is not None:
+            rows.extend([("bottom", row) for row in bottom])
+        for end, (group, average, scored, count) in rows:
+            row = [group, repr(average), str(scored), str(count)]
+            if args.top is not None:
+                row.insert(0, end)
+            if len(args.tweets) > 1:
+                row.insert(0, name)
+            sys.stdout.write("\t".join(row) + "\n")
+
+
+def trend_command(args, sentiments, cache, filters, stats=None, memo=None):
+    """Run the trend command, writing one tab separated line per time bucket
+    and state or zip code: the input file if there is more than one, the start
+    of the bucket, the state or zip code, the average sentiment and the number
+    of tweets"""
+    if stats is None:
+        stats = NULL_STATS
+    for name in args.tweets:
+        f = open_tweets(name)
+        try:
+            tweets = TweetTable(analyze_tweets(f, sentiments, args.chunk_size, args.engine, None, cache, None,
+                                               stats if stats.enabled else None, memo, **filters))
+        finally:
+            if f is not sys.stdin:
+                f.close()
+        with stats.stage("word_index", len(tweets)):
+            tweets = index_tweets(tweets)
+        with stats.stage("trend", len(tweets)):
+            trend = sentiment_trend(tweets, args.bucket, args.rank_word, args.by)
+        for start, group, average, count in trend:
+            row = [start.strftime("%Y-%m-%d %H:%M:%S"), group, repr(average), str(count)]
+            if len(args.tweets) > 1:
+                row.insert(0, name)
+            sys.stdout.write("\t".join(row) + "\n")
+
+
+def main(argv=None):
+    """Run the command line, see command_line_parser"""
+    parser = command_line_parser()
+    # Files of tweets can also come after the options, which argparse leaves
+    # over once it has matched the positional arguments
+    args, extra = parser.parse_known_args(argv)
+    for name in extra:
+        if name.startswith("-") and name != "-":
+            parser.error("unrecognized arguments: " + " ".join(extra))
+    args.tweets.extend(extra)
+    if not args.tweets:
+        args.tweets = ["-"]
+    if args.command == "analyze":
+        if args.workers != 1 and args.output_dir is None and (args.output == "-" or args.tweets == ["-"] or
+                                                              len(args.tweets) > 1):
+            parser.error("--workers needs --output-dir, or -o with a single input file")
+        if args.output_dir is not None and not os.path.isdir(args.output_dir):
+            try:
+                os.makedirs(args.output_dir)
+            except OSError as error:
+                parser.error("can't create --output-dir %s: %s" % (args.output_dir, error.strerror))
+    filters = {}
+    for key in ("state", "zip", "word", "since", "until"):
+        if getattr(args, key) is not None:
+            filters[key] = getattr(args, key)
+    stats = None
+    if args.stats:
+        stats = PipelineStats()
+    # Load the zip codes and the sentiments once for every input
+    with (stats or NULL_STATS).stage("load_gazetteer"):
+        load_gazetteer()
+    with (stats or NULL_STATS).stage("load_lexicon"):
+        sentiments = load_sentiments(args.sentiments)
+    cache = None
+    if args.cache_dir is not None:
+        max_bytes = None
+        if args.cache_size is not None:
+            max_bytes = args.cache_size * 1024 * 1024
+        cache = ResultsCache(args.cache_dir, max_bytes)
+    memo = None
+    if args.geo_memo > 0:
+        memo = GeoMemo(args.geo_memo, args.geo_precision)
+    if args.command == "analyze":
+        analyze_command(args, sentiments, cache, filters, stats, memo)
+    elif args.command == "rank":
+        rank_command(args, sentiments, cache, filters, stats, memo)
+    else:
+        trend_command(args, sentiments, cache, filters, stats, memo)
+    if stats is not None:
+        logging.basicConfig(stream=sys.stderr, level=logging.INFO, format="%(message)s")
+        stats.log()
+    return 0
+
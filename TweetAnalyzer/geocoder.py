@@ -0,0 +1,740 @@
+"""Finding the zip code and state of tweets from the gazetteer of zip codes.
+The gazetteer is only read the first time a tweet is geocoded"""
+from math import radians, degrees, pow, asin, cos, sin, sqrt, ceil, floor
+import os
+import mmap
+import struct
+from array import array
+from collections import OrderedDict
+
+from .optional import load_numpy
+from .parser import tweet_location
+
+
+# The zip codes that come with TweetAnalyzer, next to the package so they are
+# found whatever directory it is run from
+ZIPS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "zips.csv")
+
+
+def make_zip(zipcode):
+    """Return a zip code, represented as a python dictionary.
+    zipcode: a list containing a single zip codes data ordered as in zips.csv
+
+    Dictionary keys:
+    zip    -- A string; the sip code
+    state   -- A string; Two-letter postal code for state
+    lat    -- A number; latitude of zip code location
+    lon    -- A number; longitude of zip code location
+    city   -- A string; name of city assoicated with zip code
+
+    """
+    # Split each input line on the ,
+    zipdata = zipcode.split(",")
+    # Remove leading and trailing space and the "" that surround values
+    code = zipdata[0].strip().strip('"').strip()
+    state = zipdata[1].strip().strip('"').strip()
+    lat = zipdata[2].strip().strip('"').strip()
+    lon = zipdata[3].strip().strip('"').strip()
+    city = zipdata[4].strip().strip('"').strip()
+    # Create a dictionary of zip code info
+    zipinfo = {"zip": code, "state": state, "lat": lat, "lon": lon, "city": city}
+    return zipinfo
+
+
+def find_zip(tweet, zip_list, index=None):
+    """return zipcode associated with a tweets location data
+    zip_list is a list of zip_codes represented as dictionaries
+    index is an optional ZipIndex or ZipGrid built from zip_list, when it is
+    not given every zip code is checked (the brute force reference mode)"""
+    # Get the location of the tweet
+    tweetloc = tweet_location(tweet)
+    if index is not None:
+        # Ask the index for the closest zip code
+        smallestindex = index.nearest(tweetloc[0], tweetloc[1])
+        # A ZipGrid already knows when there is no zip code close enough
+        if smallestindex < 0:
+            return {"zip": "N/A", "state": "N/A"}
+        ziploc = (zip_list[smallestindex]["lat"], zip_list[smallestindex]["lon"])
+        smallestdistance = geo_distance(tweetloc, ziploc)
+    else:
+        # Take the location of the first zip code
+        firstloc = (zip_list[0]["lat"], zip_list[0]["lon"])
+        # Calculate the distance between the two locations
+        smallestdistance = geo_distance(tweetloc, firstloc)
+        # Set the index of the smallest distance this will be updated in the loop below
+        smallestindex = 0
+        count = 0
+        for zip in zip_list:
+            # For each zip code in the list calculate the new distance
+            ziplat = zip_list[count]["lat"]
+            ziplon = zip_list[count]["lon"]
+            ziploc = (ziplat, ziplon)
+            distance = geo_distance(tweetloc, ziploc)
+            # Check to see if the newly calculated distance is smaller than the previous smallestdistance if it is update
+            # the smallestdistance and record the index
+            if distance < smallestdistance:
+                smallestdistance = distance
+                smallestindex = count
+            count = count + 1
+    # If the smallest distance is more than 200 miles away it is not in the US and does not have a real zip code
+    if smallestdistance > CUTOFF_MILES:
+        zipdata = {"zip":"N/A", "state":"N/A"}
+    else:
+        # Create a dictionary of the zip code data
+        zipdata = {"zip":zip_list[smallestindex]["zip"], "state":zip_list[smallestindex]["state"]}
+
+
+
+    # Return the dictionary of zip code info
+    return zipdata
+
+
+def sphere_point(lat, lon):
+    """Return a tuple (x, y, z) of the point on the unit sphere at the
+    given latitude and longitude"""
+    lat = radians(float(lat))
+    lon = radians(float(lon))
+    return (cos(lat) * cos(lon), cos(lat) * sin(lon), sin(lat))
+
+
+class ZipIndex(object):
+    """Nearest neighbour index over the locations of a list of zip codes.
+
+    The zip codes are placed on the unit sphere and stored in a k-d tree.
+    The straight line distance between two points on the sphere grows with
+    the great circle distance, so the closest point in the tree is also the
+    closest zip code.
+
+    """
+
+    def __init__(self, zip_list):
+        # Convert every zip code location to a point on the sphere
+        points = []
+        for count in range(len(zip_list)):
+            x, y, z = sphere_point(zip_list[count]["lat"], zip_list[count]["lon"])
+            points.append((x, y, z, count))
+        # Arrange the points so that the middle of every range is the node
+        # splitting that range, the tree needs no other storage
+        ranges = [(0, len(points), 0)]
+        while ranges:
+            lo, hi, axis = ranges.pop()
+            if hi - lo < 2:
+                continue
+            points[lo:hi] = sorted(points[lo:hi], key=lambda p: (p[axis], p[3]))
+            mid = (lo + hi) // 2
+            ranges.append((lo, mid, (axis + 1) % 3))
+            ranges.append((mid + 1, hi, (axis + 1) % 3))
+        # Keep one list per coordinate, looking values up is faster that way
+        self.xs = [p[0] for p in points]
+        self.ys = [p[1] for p in points]
+        self.zs = [p[2] for p in points]
+        self.ids = [p[3] for p in points]
+
+    @classmethod
+    def from_tree(cls, xs, ys, zs, ids):
+        """Return a ZipIndex from the coordinate and id lists of an already
+        arranged tree, as saved by a Gazetteer cache file"""
+        index = cls.__new__(cls)
+        index.xs = list(xs)
+        index.ys = list(ys)
+        index.zs = list(zs)
+        index.ids = list(ids)
+        return index
+
+    def __len__(self):
+        return len(self.ids)
+
+    def nearest(self, lat, lon):
+        """Return the position in the zip list of the zip code closest to
+        the given latitude and longitude"""
+        x, y, z = sphere_point(lat, lon)
+        coords = (self.xs, self.ys, self.zs)
+        ids = self.ids
+        bestdistance = float("inf")
+        bestindex = -1
+        # Each entry is a range of the tree, its split axis and how far the
+        # point is from the range (only known for ranges on the far side)
+        ranges = [(0, len(ids), 0, 0.0)]
+        while ranges:
+            lo, hi, axis, boxdistance = ranges.pop()
+            # Skip ranges that can't hold anything closer than the best so far
+            if lo >= hi or boxdistance > bestdistance:
+                continue
+            mid = (lo + hi) >> 1
+            dx = x - self.xs[mid]
+            dy = y - self.ys[mid]
+            dz = z - self.zs[mid]
+            distance = dx * dx + dy * dy + dz * dz
+            # Ties go to the zip code that comes first in the zip list,
+            # the same one a scan of the whole list would keep
+            if distance < bestdistance or (distance == bestdistance and ids[mid] < bestindex):
+                bestdistance = distance
+                bestindex = ids[mid]
+            split = (x, y, z)[axis] - coords[axis][mid]
+            nextaxis = (axis + 1) % 3
+            # Visit the side of the split the point is on first, so it is
+            # pushed last
+            if split < 0:
+                ranges.append((mid + 1, hi, nextaxis, split * split))
+                ranges.append((lo, mid, nextaxis, 0.0))
+            else:
+                ranges.append((lo, mid, nextaxis, split * split))
+                ranges.append((mid + 1, hi, nextaxis, 0.0))
+        return bestindex
+
+
+# Tweets further than this many miles from every zip code are not in the US
+CUTOFF_MILES = 200
+# Radius of the earth in miles, as used by geo_distance
+EARTH_RADIUS_MILES = 6378.1 * 0.621371
+
+
+class ZipGrid(object):
+    """A grid of cells of cell_size degrees of latitude and longitude over
+    the locations of a list of zip codes.
+
+    Every cell that has any point within CUTOFF_MILES of a zip code is
+    marked, so a tweet in an unmarked cell (most of the world) is known to
+    have no zip code after one lookup. For the others the zip codes are
+    searched a ring of cells at a time outwards from the tweet's cell, until
+    no unsearched cell can hold anything closer than the best so far.
+
+    """
+
+    def __init__(self, zip_list, cell_size=0.5):
+        self.cell_size = cell_size
+        self.rows = int(ceil(180 / cell_size))
+        self.columns = int(ceil(360 / cell_size))
+        # The zip codes in each cell, as points on the sphere and positions
+        # in zip_list, by the number of the cell
+        cells = {}
+        if isinstance(zip_list, Gazetteer):
+            lats, lons = zip_list.lats, zip_list.lons
+        else:
+            lats = [float(zipcode["lat"]) for zipcode in zip_list]
+            lons = [float(zipcode["lon"]) for zipcode in zip_list]
+        for count in range(len(lats)):
+            lat = lats[count]
+            lon = lons[count]
+            cell = self.cell(lat, lon)
+            if cell not in cells:
+                cells[cell] = ([], [], [], [])
+            x, y, z = sphere_point(lat, lon)
+            points = cells[cell]
+            points[0].append(x)
+            points[1].append(y)
+            points[2].append(z)
+            points[3].append(count)
+        self.cells = cells
+        # Mark the cells near each cell with zip codes in it. A little is
+        # added to the cutoff so rounding can never leave a cell unmarked
+        reach = degrees(CUTOFF_MILES / EARTH_RADIUS_MILES) + cell_size / 100
+        self.near = bytearray(self.rows * self.columns)
+        for cell in cells:
+            row, column = divmod(cell, self.columns)
+            south = row * cell_size - 90 - reach
+            north = (row + 1) * cell_size - 90 + reach
+            # A cutoff that far from the equator covers more degrees of
+            # longitude, and all of them close to the poles
+            widest = max(abs(south), abs(north))
+            if widest >= 90 or sin(radians(reach)) >= cos(radians(widest)):
+                first, last = 0, self.columns - 1
+            else:
+                spread = degrees(asin(sin(radians(reach)) / cos(radians(widest))))
+                first = int(floor((column * cell_size - spread) / cell_size))
+                last = int(floor(((column + 1) * cell_size + spread) / cell_size))
+            # Mark the columns of each row a slice at a time, in two pieces
+            # when they go past 180 degrees of longitude
+            last = min(last, first + self.columns - 1)
+            pieces = [(first % self.columns, last - first + 1)]
+            if pieces[0][0] + pieces[0][1] > self.columns:
+                start, length = pieces[0]
+                pieces = [(start, self.columns - start), (0, length - (self.columns - start))]
+            for markrow in range(max(int(floor((south + 90) / cell_size)), 0),
+                                 min(int(floor((north + 90) / cell_size)), self.rows - 1) + 1):
+                for start, length in pieces:
+                    start += markrow * self.columns
+                    self.near[start:start + length] = b"\1" * length
+
+    @classmethod
+    def from_arrays(cls, cell_size, near, numbers, starts, xs, ys, zs, ids):
+        """Return a ZipGrid from the arrays given by arrays, as saved by a
+        Gazetteer cache file"""
+        grid = cls.__new__(cls)
+        grid.cell_size = cell_size
+        grid.rows = int(ceil(180 / cell_size))
+        grid.columns = int(ceil(360 / cell_size))
+        grid.near = near
+        xs, ys, zs, ids = list(xs), list(ys), list(zs), list(ids)
+        grid.cells = {}
+        for count in range(len(numbers)):
+            start = starts[count]
+            end = starts[count + 1]
+            grid.cells[numbers[count]] = (xs[start:end], ys[start:end], zs[start:end], ids[start:end])
+        return grid
+
+    def arrays(self):
+        """Return the cells as flat arrays: the numbers of the cells with zip
+        codes in them, where the zip codes of each cell start in the other
+        arrays (and where the last one ends), and the points on the sphere
+        and positions in the zip list of the zip codes, cell by cell"""
+        numbers = sorted(self.cells)
+        starts = array("i", [0])
+        xs, ys, zs, ids = array("d"), array("d"), array("d"), array("i")
+        for cell in numbers:
+            points = self.cells[cell]
+            xs.extend(points[0])
+            ys.extend(points[1])
+            zs.extend(points[2])
+            ids.extend(points[3])
+            starts.append(len(ids))
+        return array("i", numbers), starts, xs, ys, zs, ids
+
+    def cell(self, lat, lon):
+        """Return the number of the cell holding a latitude and longitude"""
+        row = min(max(int((lat + 90) // self.cell_size), 0), self.rows - 1)
+        column = int((lon + 180) // self.cell_size) % self.columns
+        return row * self.columns + column
+
+    def covers(self, lat, lon):
+        """Return False if the latitude and longitude are certainly further
+        than CUTOFF_MILES from every zip code, True if they might not be"""
+        return bool(self.near[self.cell(lat, lon)])
+
+    def nearest(self, lat, lon):
+        """Return the position in the zip list of the zip code closest to
+        the given latitude and longitude, or -1 if it is certainly further
+        than CUTOFF_MILES away. Ties go to the first zip code, like ZipIndex"""
+        if not self.covers(lat, lon):
+            return -1
+        x, y, z = sphere_point(lat, lon)
+        size = self.cell_size
+        home = self.cell(lat, lon)
+        row, column = divmod(home, self.columns)
+        # Angles from the point to the cutoff and to the edges of its cell
+        cutoff = CUTOFF_MILES / EARTH_RADIUS_MILES + 1e-9
+        coslat = cos(radians(lat))
+        north = row * size - 90 + size - lat
+        south = lat - (row * size - 90)
+        east = column * size - 180 + size - lon
+        west = lon - (column * size - 180)
+        bestdistance = float("inf")
+        bestindex = -1
+        seen = set()
+        ring = 0
+        while True:
+            for cell in self.ring(row, column, ring):
+                if cell in seen or cell not in self.cells:
+                    continue
+                seen.add(cell)
+                xs, ys, zs, ids = self.cells[cell]
+                for count in range(len(ids)):
+                    dx = x - xs[count]
+                    dy = y - ys[count]
+                    dz = z - zs[count]
+                    distance = dx * dx + dy * dy + dz * dz
+                    if distance < bestdistance or (distance == bestdistance and ids[count] < bestindex):
+                        bestdistance = distance
+                        bestindex = ids[count]
+            # The closest any cell outside the rings searched so far can be,
+            # going past the rows above or below or the meridians to the
+            # sides of them
+            gap = ring * size
+            bound = radians(min(north + gap, south + gap))
+            if (2 * ring + 1) * size < 360:
+                for side in (east + gap, west + gap):
+                    bound = min(bound, asin(min(1.0, coslat * abs(sin(radians(side))))))
+            # Distances are compared as squared straight lines, like ZipIndex
+            if bound > cutoff or (2 * sin(bound / 2)) ** 2 >= bestdistance:
+                break
+            ring += 1
+        return bestindex
+
+    def ring(self, row, column, ring):
+        """Return the numbers of the cells ring cells away from a cell"""
+        if ring == 0:
+            return [row * self.columns + column]
+        cells = []
+        for side in range(-ring, ring + 1):
+            for cellrow, cellcolumn in ((row - ring, column + side), (row + ring, column + side),
+                                        (row + side, column - ring), (row + side, column + ring)):
+                if 0 <= cellrow < self.rows:
+                    cells.append(cellrow * self.columns + cellcolumn % self.columns)
+        return cells
+
+
+class Gazetteer(object):
+    """The zip codes from zips.csv held in packed arrays.
+
+    Zip codes and states are kept as fixed width text buffers and the
+    locations as arrays of floats, instead of one dictionary per zip code.
+    Indexing a Gazetteer returns a dictionary with the zip, state, lat and
+    lon keys so it can be used anywhere a zip list is expected.
+
+    """
+
+    def __init__(self, codes, states, lats, lons, index=None):
+        # Width of each zip code and state in the text buffers
+        self.zipwidth = max([len(code) for code in codes] or [0])
+        self.statewidth = max([len(state) for state in states] or [0])
+        self.codes = "".join([code.ljust(self.zipwidth) for code in codes])
+        self.states = "".join([state.ljust(self.statewidth) for state in states])
+        self.lats = array("d", lats)
+        self.lons = array("d", lons)
+        self._index = index
+        self._grid = None
+
+    def __len__(self):
+        return len(self.lats)
+
+    def __getitem__(self, count):
+        return {"zip": self.zip_code(count), "state": self.state(count),
+                "lat": self.lats[count], "lon": self.lons[count]}
+
+    def zip_code(self, count):
+        """Return the zip code at the given position"""
+        start = count * self.zipwidth
+        return self.codes[start:start + self.zipwidth].rstrip()
+
+    def state(self, count):
+        """Return the state abbreviation at the given position"""
+        start = count * self.statewidth
+        return self.states[start:start + self.statewidth].rstrip()
+
+    @property
+    def index(self):
+        """The ZipIndex over these zip codes, built the first time it is used"""
+        if self._index is None:
+            self._index = ZipIndex(self)
+        return self._index
+
+    @property
+    def grid(self):
+        """The ZipGrid over these zip codes, built the first time it is used"""
+        if self._grid is None:
+            self._grid = ZipGrid(self)
+        return self._grid
+
+
+# Layout of the header of a gazetteer cache file: a marker, the version of
+# the layout, the size and modification time of the csv file it was made
+# from, the number of zip codes, the widths of the zip and state text, the
+# number of cells of the ZipGrid with zip codes in them and its cell size
+GAZETTEER_HEADER = struct.Struct("=4sIqqIIIId")
+GAZETTEER_MAGIC = b"TAZG"
+GAZETTEER_VERSION = 2
+
+# Gazetteers that have already been loaded, by file name
+_gazetteers = {}
+
+
+def read_gazetteer_csv(filename):
+    """Return a Gazetteer with the zip codes in a csv file formatted like
+    zips.csv"""
+    codes = []
+    states = []
+    lats = []
+    lons = []
+    f = open(filename, 'r')
+    # Skip the first line which contains no data other than formatting
+    f.readline()
+    for line in f:
+        zipinfo = make_zip(line)
+        codes.append(zipinfo["zip"])
+        states.append(zipinfo["state"])
+        lats.append(float(zipinfo["lat"]))
+        lons.append(float(zipinfo["lon"]))
+    f.close()
+    return Gazetteer(codes, states, lats, lons)
+
+
+def write_gazetteer_cache(gazetteer, filename, cachename):
+    """Save a gazetteer, its ZipIndex and its ZipGrid to cachename so they
+    can be loaded again without reading the csv file filename. The floats
+    come first and then the ints so every array is aligned"""
+    info = os.stat(filename)
+    count = len(gazetteer)
+    index = gazetteer.index
+    grid = gazetteer.grid
+    numbers, starts, xs, ys, zs, ids = grid.arrays()
+    header = GAZETTEER_HEADER.pack(GAZETTEER_MAGIC, GAZETTEER_VERSION,
+                                   info.st_size, int(info.st_mtime * 1000000),
+                                   count, gazetteer.zipwidth, gazetteer.statewidth,
+                                   len(numbers), grid.cell_size)
+    # Write to a temporary file first so no one ever reads half a cache
+    tempname = cachename + ".tmp"
+    f = open(tempname, 'wb')
+    f.write(header)
+    for values in (gazetteer.lats, gazetteer.lons, array("d", index.xs),
+                   array("d", index.ys), array("d", index.zs), xs, ys, zs):
+        f.write(values.tobytes())
+    for values in (array("i", index.ids), ids, numbers, starts):
+        f.write(values.tobytes())
+    f.write(bytes(grid.near))
+    f.write(gazetteer.codes.encode("latin-1"))
+    f.write(gazetteer.states.encode("latin-1"))
+    f.close()
+    os.replace(tempname, cachename)
+
+
+def read_gazetteer_cache(filename, cachename):
+    """Return the Gazetteer saved in cachename by write_gazetteer_cache, or
+    None if there is no cache or it was not made from the current filename"""
+    try:
+        info = os.stat(filename)
+        f = open(cachename, 'rb')
+    except (IOError, OSError):
+        return None
+    try:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, mmap.error):
+        f.close()
+        return None
+    f.close()
+    if len(data) < GAZETTEER_HEADER.size:
+        return None
+    magic, version, size, mtime, count, zipwidth, statewidth, cellcount, cell_size = \
+        GAZETTEER_HEADER.unpack_from(data)
+    # The cache is stale if the csv file changed since it was written
+    if (magic != GAZETTEER_MAGIC or version != GAZETTEER_VERSION or
+            size != info.st_size or mtime != int(info.st_mtime * 1000000)):
+        return None
+    view = memoryview(data)
+    offset = GAZETTEER_HEADER.size
+    columns = []
+    # The lengths of the arrays, in the order they were written
+    lengths = [count] * 8 + [count, count, cellcount, cellcount + 1]
+    for code, length in zip("ddddddddiiii", lengths):
+        width = struct.calcsize(code) * length
+        columns.append(view[offset:offset + width].cast(code))
+        offset += width
+    rows = int(ceil(180 / cell_size))
+    near = view[offset:offset + rows * int(ceil(360 / cell_size))]
+    offset += len(near)
+    codes = bytes(view[offset:offset + count * zipwidth]).decode("latin-1")
+    offset += count * zipwidth
+    states = bytes(view[offset:offset + count * statewidth]).decode("latin-1")
+    gazetteer = Gazetteer.__new__(Gazetteer)
+    gazetteer.zipwidth = zipwidth
+    gazetteer.statewidth = statewidth
+    gazetteer.codes = codes
+    gazetteer.states = states
+    gazetteer.lats = columns[0]
+    gazetteer.lons = columns[1]
+    gazetteer._index = ZipIndex.from_tree(columns[2], columns[3], columns[4], columns[8])
+    gazetteer._grid = ZipGrid.from_arrays(cell_size, near, columns[10], columns[11], columns[5], columns[6],
+                                          columns[7], columns[9])
+    return gazetteer
+
+
+def load_gazetteer(filename=ZIPS_FILE):
+    """Return the Gazetteer for the zip codes in filename. It is only loaded
+    once per process, from a compiled cache file next to the csv when one is
+    up to date, otherwise from the csv (which then refreshes the cache)"""
+    if filename in _gazetteers:
+        return _gazetteers[filename]
+    cachename = filename + ".cache"
+    gazetteer = read_gazetteer_cache(filename, cachename)
+    if gazetteer is None:
+        gazetteer = read_gazetteer_csv(filename)
+        try:
+            write_gazetteer_cache(gazetteer, filename, cachename)
+        except (IOError, OSError):
+            # A read only directory only means the next run is slower
+            pass
+    _gazetteers[filename] = gazetteer
+    return gazetteer
+
+
+def geo_distance(loc1, loc2):
+    """Return the great circle distance (in miles) between two
+    tuples of (latitude,longitude)
+
+    Uses the "haversine" formula.
+    http://en.wikipedia.org/wiki/Haversine_formula"""
+    # radius of earth given in miles
+    radiusofearth = 6378.1
+    # Take latitude and longitue from the given tupples
+    lat1 = float(loc1[0])
+    lon1 = float(loc1[1])
+    lat2 = float(loc2[0])
+    lon2 = float(loc2[1])
+    # Part of the equation that goes inside the inverse sin
+    theta = sqrt(
+        pow(sin(radians((lat2 - lat1) / 2)), 2) + (
+        (( cos(radians(lat1))) * ( cos(radians(lat2)))) * pow(sin(radians((lon2 - lon1) / 2)), 2)))
+    # Calculate distance with the haversin formula
+    distance = (radiusofearth * 2) * asin(theta)
+    # Convert from kilometers to miles
+    distanceinmiles = distance * 0.621371
+    return distanceinmiles
+
+
+def find_zips_numpy(locations, zip_list, chunk_size=64):
+    """Return two lists, the zip codes and the states associated with each
+    (latitude, longitude) tuple in locations. This gives the same answers as
+    find_zip but works out the distances to every zip code for a whole chunk
+    of locations at once with NumPy. At most chunk_size * len(zip_list)
+    distances are held in memory at a time."""
+    numpy = load_numpy()
+    # Put the zip code locations into arrays once
+    if isinstance(zip_list, Gazetteer):
+        ziplat = numpy.asarray(zip_list.lats, dtype=float)
+        ziplon = numpy.asarray(zip_list.lons, dtype=float)
+    else:
+        ziplat = numpy.array([float(z["lat"]) for z in zip_list])
+        ziplon = numpy.array([float(z["lon"]) for z in zip_list])
+    zipcos = numpy.cos(numpy.radians(ziplat))
+    zips = []
+    states = []
+    for start in range(0, len(locations), chunk_size):
+        chunk = locations[start:start + chunk_size]
+        lat = numpy.array([float(loc[0]) for loc in chunk])[:, None]
+        lon = numpy.array([float(loc[1]) for loc in chunk])[:, None]
+        # The part of the haversine formula inside the inverse sin, squared.
+        # It grows with the distance so the smallest one is the closest zip
+        theta = numpy.sin(numpy.radians((ziplat - lat) / 2)) ** 2 + (
+            numpy.cos(numpy.radians(lat)) * zipcos) * numpy.sin(numpy.radians((ziplon - lon) / 2)) ** 2
+        closest = numpy.argmin(theta, axis=1)
+        for loc, smallestindex in zip(chunk, closest):
+            zipcode = zip_list[smallestindex]
+            # Check the 200 mile limit with the same distance find_zip uses
+            if geo_distance(loc, (zipcode["lat"], zipcode["lon"])) > CUTOFF_MILES:
+                zips.append("N/A")
+                states.append("N/A")
+            else:
+                zips.append(zipcode["zip"])
+                states.append(zipcode["state"])
+    return zips, states
+
+
+class GeoMemo(object):
+    """The zip codes and states of the locations geocoded most recently, so
+    tweets posted from the same place again are not searched for again.
+
+    At most max_entries locations are kept, the least recently used one is
+    dropped first. With precision None locations are only the same when
+    their coordinates are exactly equal, which gives the same answers as not
+    using a memo. Otherwise coordinates are rounded to precision decimal
+    places and each rounded location is geocoded in place of the tweets
+    rounded to it (2 places is about half a mile at most).
+
+    """
+
+    def __init__(self, max_entries=100000, precision=None):
+        self.max_entries = max_entries
+        self.precision = precision
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def key(self, lat, lon):
+        """Return the location a latitude and longitude are memoized as"""
+        if self.precision is None:
+            return (lat, lon)
+        return (round(lat, self.precision), round(lon, self.precision))
+
+    def get(self, key):
+        """Return the (zip, state) of a key, or None if it isn't known"""
+        found = self.entries.get(key)
+        if found is not None:
+            self.entries.move_to_end(key)
+        return found
+
+    def put(self, key, zip_code, state):
+        self.entries[key] = (zip_code, state)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+def add_geo(tweets, engine="index", memo=None):
+    """adds the new keys state and zip to each tweet dictionary in the list tweets
+
+    engine chooses how the closest zip code is found:
+    index -- search a ZipIndex built from the zip codes (the default)
+    grid  -- search the cells of a ZipGrid around each tweet
+    numpy -- find the zip codes of many tweets at once with find_zips_numpy,
+             when NumPy is not installed the index engine is used instead
+    brute -- check every zip code for every tweet, kept as a reference
+
+    Except with brute, tweets in parts of the world the ZipGrid knows are
+    too far from every zip code get N/A without any distances worked out
+
+    memo is an optional GeoMemo, only the locations it doesn't know are
+    geocoded and each of them only once
+
+    """
+    if engine not in ("grid", "index", "numpy", "brute"):
+        raise ValueError("Unknown geo engine: " + str(engine))
+    if memo is not None:
+        # The tweets at each location the memo doesn't know yet
+        pending = OrderedDict()
+        for tweet in tweets:
+            lat, lon = tweet_location(tweet)
+            key = memo.key(lat, lon)
+            found = None
+            if key not in pending:
+                found = memo.get(key)
+            if found is not None:
+                memo.hits += 1
+                tweet["zip"], tweet["state"] = found
+            elif key in pending:
+                # Found by the search for an earlier tweet
+                memo.hits += 1
+                pending[key].append(tweet)
+            else:
+                memo.misses += 1
+                pending[key] = [tweet]
+        # Geocode one stand in tweet per location
+        locations = [{"lat": lat, "lon": lon} for lat, lon in pending]
+        add_geo(locations, engine)
+        for location, key in zip(locations, pending):
+            memo.put(key, location["zip"], location["state"])
+            for tweet in pending[key]:
+                tweet["zip"] = location["zip"]
+                tweet["state"] = location["state"]
+        return tweets
+    if engine == "numpy" and load_numpy() is None:
+        engine = "index"
+    # Load the roster of zip codes, this is hardcoded because zip codes won't change
+    zip_list = load_gazetteer()
+    if engine != "brute":
+        grid = zip_list.grid
+        # Only the tweets that might be close to a zip code are searched
+        near = []
+        for tweet in tweets:
+            lat, lon = tweet_location(tweet)
+            if grid.covers(lat, lon):
+                near.append(tweet)
+            else:
+                tweet["zip"] = "N/A"
+                tweet["state"] = "N/A"
+    else:
+        near = tweets
+    # The numpy engine handles all of the tweets in one call
+    if engine == "numpy":
+        locations = [tweet_location(tweet) for tweet in near]
+        zips, states = find_zips_numpy(locations, zip_list)
+        for count in range(len(near)):
+            near[count]["zip"] = zips[count]
+            near[count]["state"] = states[count]
+        return tweets
+    # Use the grid or nearest neighbour index unless the brute force search
+    # was asked for
+    if engine == "grid":
+        index = zip_list.grid
+    elif engine == "index":
+        index = zip_list.index
+    else:
+        index = None
+    # For each tweet in the array of tweets append zip code and state information
+    for tweet in near:
+        code = find_zip(tweet, zip_list, index)
+        tweet["zip"] = code["zip"]
+        tweet["state"] = code["state"]
+
+    return tweets
@@ -0,0 +1,336 @@
+"""The Tkinter window of TweetAnalyzer. Tkinter is only imported with this
+module, run it with python GUI.py"""
+import tkinter as Tkinter
+from tkinter import filedialog as tkFileDialog
+from tkinter import messagebox as tkMessageBox
+from tkinter import ttk
+import queue
+import threading
+
+from .geocoder import GeoMemo
+from .query import (STATES_FILE, create_state_database, find_average_sentiment, most_negative, most_positive,
+                    top_sentiments)
+from .pipeline import (AnalysisCancelled, AnalyzedCorpus, ResultsCache, count_lines, default_cache_directory,
+                       write_tweets)
+
+
+class TweetAnalyzerGUI:
+    def __init__(self):
+
+        # Create the main window.
+        self.main_window = Tkinter.Tk()
+        self.main_window.title("Tweet Analyzer")
+
+        # Keep analyzed tweets between runs so the same file is only
+        # analyzed once
+        self.cache = ResultsCache(
+            default_cache_directory(), 512 * 1024 * 1024)
+        # Zip codes of recent locations, kept for every file analyzed
+        self.geo_memo = GeoMemo()
+
+        # The analyzed tweets of the chosen files, made the first time they
+        # are needed and kept until a different file is chosen
+        self.corpus = None
+
+        # Messages from the background analysis to the window
+        self.messages = queue.Queue()
+        # Set to ask the background analysis to stop
+        self.cancel_event = threading.Event()
+        self.worker = None
+
+        # Create frames for the groups of widgets.
+        self.input_frame = Tkinter.Frame(self.main_window)
+        self.output_frame = Tkinter.Frame(self.main_window)
+        self.filter_frame = Tkinter.Frame(self.main_window)
+        self.positive_negative_frame = Tkinter.Frame(self.main_window)
+        self.button_frame = Tkinter.Frame(self.main_window)
+        self.progress_frame = Tkinter.Frame(self.main_window)
+
+        #Get the location of the input file
+        self.tweet_input_label = \
+            Tkinter.Label(self.input_frame,text="Enter a file of tweets to be"
+                                                " analyzed:")
+        self.tweet_input_button = Tkinter.Button(self.input_frame,
+                                                 text="Choose a file",
+                                                 command=self.get_input_file)
+        self.sentiment_input_label = Tkinter.Label(self.input_frame,
+                                                   text="Enter a file of "
+                                                        "sentiment values to"
+                                                        " use:")
+        self.sentiment_input_button = Tkinter.Button(self.input_frame,
+                                                     text="Choose a file",
+                                                     command=
+                                                     self.get_sentiments_file)
+        self.tweet_input_label.pack(side='left')
+        self.tweet_input_button.pack(side='left')
+        self.sentiment_input_label.pack(side='left')
+        self.sentiment_input_button.pack(side='left')
+
+        #Get the location of the output file
+        self.output_label = Tkinter.Label(self.output_frame,
+                                          text="Enter a location for analyzed"
+                                               " tweets to be stored:")
+        self.output_button = Tkinter.Button(self.output_frame,
+                                            text="Choose an output file",
+                                            command=self.get_output_file)
+        self.output_label.pack(side='left')
+        self.output_button.pack(side='left')
+        #State filter
+        self.state_filter_label = Tkinter.Label(self.filter_frame,
+                                                text='Enter a two letter state'
+                                                     ' abbreviation to filter by:')
+        self.state_filter_entry = Tkinter.Entry(self.filter_frame, width=10)
+
+        self.state_filter_label.pack(side='left')
+        self.state_filter_entry.pack(side='left')
+        #Zip code filter
+        self.zip_filter_label = Tkinter.Label(self.filter_frame,
+                                              text='Enter a zip code to filter'
+                                                   ' by:')
+        self.zip_filter_entry = Tkinter.Entry(self.filter_frame, width=10)
+
+        self.zip_filter_label.pack(side='left')
+        self.zip_filter_entry.pack(side='left')
+        #Text filter
+        self.text_filter_label = Tkinter.Label(self.filter_frame,
+                                               text='Enter text to filter by:')
+        self.text_filter_entry = Tkinter.Entry(self.filter_frame, width=10)
+
+        self.text_filter_label.pack(side='left')
+        self.text_filter_entry.pack(side='left')
+
+        #Most positive and most negative sentiment
+        self.positive_negative_label = Tkinter.Label(
+            self.positive_negative_frame,text="Enter a word to find which "
+                                              "states have most positive and"
+                                              " negative sentiments:")
+        self.positive_negative_entry = Tkinter.Entry(
+            self.positive_negative_frame, width=10)
+
+        self.positive_negative_label.pack(side='left')
+        self.positive_negative_entry.pack(side='left')
+
+        # Create and pack the button widgets.
+        self.analyze_tweets_button = Tkinter.Button(self.button_frame,
+                                                    text='Analyze Tweets',
+                                                    command=self.analyze)
+        self.find_positive_negative_button = Tkinter.Button(
+            self.button_frame,text='Find State With Most Positive and '
+                                   'Negative Sentiment',
+            command=self.find_positive_negative)
+        self.quit_button = Tkinter.Button(self.button_frame, text='Quit',
+                                          command=self.main_window.quit)
+        self.analyze_tweets_button.pack(side='left')
+        self.find_positive_negative_button.pack(side='left')
+        self.quit_button.pack(side='left')
+
+        # Progress of the analysis and a button to stop it
+        self.progress_bar = ttk.Progressbar(self.progress_frame, length=300,
+                                            mode='determinate')
+        self.progress_label = Tkinter.Label(self.progress_frame, text='')
+        self.cancel_button = Tkinter.Button(self.progress_frame,
+                                            text='Cancel',
+                                            command=self.cancel,
+                                            state='disabled')
+        self.progress_bar.pack(side='left')
+        self.progress_label.pack(side='left')
+        self.cancel_button.pack(side='left')
+
+        # Pack the frames.
+        self.input_frame.pack()
+        self.output_frame.pack()
+        self.filter_frame.pack()
+        self.positive_negative_frame.pack()
+        self.button_frame.pack()
+        self.progress_frame.pack()
+
+    def get_input_file(self):
+        #Save the path of the input file given
+        self.tweet_input_filename = tkFileDialog.askopenfilename()
+        #The tweets will need to be analyzed again
+        self.corpus = None
+
+    def get_sentiments_file(self):
+        #Save the path of the sentiments file given
+        self.sentiments_input_filename = tkFileDialog.askopenfilename()
+        #The tweets will need to be analyzed again
+        self.corpus = None
+
+    def get_output_file(self):
+        #Save the path of the output file given
+        self.outfile = tkFileDialog.asksaveasfilename()
+
+    def get_filters(self):
+        #Check to see what filters to apply...only apply filter if something is typed in the entry box
+        filters = {}
+        if len(self.state_filter_entry.get()) > 0:
+            filters["state"] = self.state_filter_entry.get()
+
+        if len(self.zip_filter_entry.get()) > 0:
+            filters["zip"] = self.zip_filter_entry.get()
+
+        if len(self.text_filter_entry.get()) > 0:
+            filters["word"] = self.text_filter_entry.get()
+        return filters
+
+    def start(self, work, done, *args):
+        #Run work(*args) in a background thread so the window keeps
+        #responding, done is called with its result when it finishes
+        if self.worker is not None:
+            return
+        self.cancel_event.clear()
+        self.progress_bar['value'] = 0
+        self.progress_label['text'] = 'Counting tweets...'
+        self.analyze_tweets_button['state'] = 'disabled'
+        self.find_positive_negative_button['state'] = 'disabled'
+        self.cancel_button['state'] = 'normal'
+        self.worker = threading.Thread(target=self.run, args=(work, args))
+        self.worker.daemon = True
+        self.worker.start()
+        self.main_window.after(100, self.poll, done)
+
+    def run(self, work, args):
+        #Runs in the background thread, the window is only ever changed by
+        #poll so everything is sent back through the queue
+        try:
+            #The files are always the first two arguments of the work, the
+            #lines only need counting when they haven't been analyzed yet
+            tweet_file, sentiments_file = args[0], args[1]
+            corpus = self.corpus
+            if corpus is not None and corpus.matches(tweet_file,
+                                                     sentiments_file):
+                total = len(corpus)
+            else:
+                total = count_lines(tweet_file)
+            self.messages.put(("total", total))
+            self.messages.put(("done", work(*args)))
+        except AnalysisCancelled:
+            self.messages.put(("cancelled", None))
+        except Exception as error:
+            self.messages.put(("error", error))
+
+    def report_progress(self, done):
+        #Progress callback for the library, called in the background thread
+        self.messages.put(("progress", done))
+        if self.cancel_event.is_set():
+            raise AnalysisCancelled()
+
+    def poll(self, done):
+        #Handle the messages from the background thread
+        try:
+            while True:
+                kind, value = self.messages.get_nowait()
+                if kind == "total":
+                    self.progress_bar['maximum'] = max(value, 1)
+                elif kind == "progress":
+                    self.progress_bar['value'] = value
+                    self.progress_label['text'] = str(value) + ' tweets analyzed'
+                else:
+                    self.finish()
+                    if kind == "done":
+                        done(value)
+                    elif kind == "cancelled":
+                        tkMessageBox.showinfo("Operation cancelled",
+                                              "The analysis was cancelled.")
+                    else:
+                        tkMessageBox.showerror("Operation failed", str(value))
+                    return
+        except queue.Empty:
+            pass
+        self.main_window.after(100, self.poll, done)
+
+    def finish(self):
+        #Put the window back the way it was before the analysis started
+        self.worker = None
+        self.progress_label['text'] = ''
+        self.analyze_tweets_button['state'] = 'normal'
+        self.find_positive_negative_button['state'] = 'normal'
+        self.cancel_button['state'] = 'disabled'
+
+    def cancel(self):
+        #Ask the background analysis to stop at the end of its chunk
+        self.cancel_event.set()
+        self.progress_label['text'] = 'Cancelling...'
+
+    def analyze(self):
+        #Read the entries now, the window can't be used from the background thread
+        self.start(self.analyze_work, self.analyze_done,
+                   self.tweet_input_filename, self.sentiments_input_filename,
+                   self.outfile, self.get_filters())
+
+    def get_corpus(self, tweet_file, sentiments_file):
+        #Analyze the chosen files unless that has already been done, runs in
+        #the background thread
+        if self.corpus is None or not self.corpus.matches(tweet_file,
+                                                          sentiments_file):
+            self.corpus = AnalyzedCorpus(
+                tweet_file, sentiments_file, cache=self.cache,
+                progress=self.report_progress, memo=self.geo_memo)
+        else:
+            self.report_progress(len(self.corpus))
+        return self.corpus
+
+    def analyze_work(self, tweet_file, sentiments_file, outfile, filters):
+        #Filter the analyzed tweets and write them to a file
+        tweets = self.get_corpus(tweet_file, sentiments_file).filter(**filters)
+        write_tweets(tweets, outfile)
+
+    def analyze_done(self, result):
+        #Tell user it completed successfully
+        tkMessageBox.showinfo("Operation completed",
+                              "Tweets analyzed successfully. Check output file"
+                              " for results.")
+
+    def find_positive_negative(self):
+        #Read the entries now, the window can't be used from the background thread
+        self.start(self.find_positive_negative_work,
+                   self.find_positive_negative_done,
+                   self.tweet_input_filename, self.sentiments_input_filename,
+                   self.get_filters(), self.positive_negative_entry.get())
+
+    def find_positive_negative_work(self, tweet_file, sentiments_file, filters,
+                                    word):
+        #Filter the analyzed tweets
+        tweets = self.get_corpus(tweet_file, sentiments_file).filter(**filters)
+
+        #Get the most positive, negative and average sentiment
+        positive_state = most_positive(tweets, word)
+        negative_state = most_negative(tweets, word)
+        avg_sentiment = find_average_sentiment(tweets)
+        #And the five most positive and negative states, from one pass
+        leaders = top_sentiments(
+            tweets, 5, word, groups=create_state_database(
+                STATES_FILE))
+        return positive_state, negative_state, avg_sentiment, leaders
+
+    def find_positive_negative_done(self, result):
+        positive_state, negative_state, avg_sentiment, leaders = result
+        top, bottom = leaders
+        #Display what is found to the user
+        tkMessageBox.showinfo("Operation completed",
+                              "Tweets analyzed successfully. "
+                              "\nState with most positive sentiment: " + str(
+                                  positive_state) + "\nState with most "
+                                                    "negative sentiment: " +
+                              str(negative_state) + "\nAverage sentiment: "
+                              + str(avg_sentiment) +
+                              "\n\nMost positive states:\n" +
+                              self.format_leaders(top) +
+                              "\nMost negative states:\n" +
+                              self.format_leaders(bottom))
+
+    def format_leaders(self, rows):
+        #One line per state with its average sentiment and number of tweets
+        lines = ""
+        for state, average, scored, count in rows:
+            lines += "%s  %.3f  (%d of %d tweets)\n" % (state, average,
+                                                         scored, count)
+        return lines
+
+
+def main():
+    # Create an instance of the TweetAnalyzerGUI class.
+    analyzer = TweetAnalyzerGUI()
+    # Start the main loop.
+    Tkinter.mainloop()
+    return analyzer
@@ -0,0 +1,21 @@
+"""Optional dependencies of TweetAnalyzer, imported the first time they are
+needed so that a process which never uses them doesn't pay for loading them"""
+
+# The numpy module, or None when it isn't installed, once it has been looked for
+_numpy = None
+_numpy_checked = False
+
+
+def load_numpy():
+    """Return the numpy module, or None if NumPy is not installed. It is only
+    needed by the numpy geo and sentiment engines and the fast paths for
+    tweet tables"""
+    global _numpy, _numpy_checked
+    if not _numpy_checked:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            _numpy = None
+        _numpy_checked = True
+    return _numpy
@@ -0,0 +1,143 @@
+"""Parsing lines of tweets into tweet dictionaries and reading their text,
+words, time and location"""
+from datetime import datetime
+from re import compile as compile_regex
+import calendar
+from sys import intern
+
+
+def make_tweet(tweet_line):
+    """Return a tweet, represented as a python dictionary.
+    tweet_line: a string corresponding to a line formatted as in all_tweets.txt
+
+    Dictionary keys:
+    text  -- A string; the text of the tweet, all in lowercase
+    time  -- A datetime object; the time that the tweet was posted
+    lat   -- A number; the latitude of the tweet's location
+    lon   -- A number; the longitude of the tweet's location
+
+    """
+    # Take the numbers between the 2 []
+    lat_long = tweet_line[tweet_line.find("[") + 1:tweet_line.find("]")]
+    # Cut the numbers between the brackets out of the tweet line
+    tweet_line = tweet_line[len(lat_long) + 2:]
+    # Split into 2 numbers at the ,
+    loc_array = lat_long.split(",")
+    # Convert numbers into a float
+    lat = float(loc_array[0])
+    lon = float(loc_array[1])
+    # Remove data from the beginning of the tweet, after the lat and lon is removed the data is 23 characters
+    tweet_data = tweet_line[:23]
+    text = tweet_line[23:]
+    # Split data on spaces
+    data = tweet_data.split()
+    # Create a timestamp of when the tweet was made
+    timestamp = data[1] + " " + data[2]
+    # Create the format for the timestamp
+    stamp_format = '%Y-%m-%d %H:%M:%S'
+    # Make a datetime object from the date
+    date = datetime.strptime(timestamp, stamp_format)
+    # Create a dictionary for the tweet
+    tweet = {"text": text, "time": date, "lat": lat, "lon": lon}
+    return tweet
+
+
+# Date and time of a tweet, as found in the 23 characters after its location
+TWEET_TIME = compile_regex(r"\s*\S+\s+(\d{4})-(\d\d)-(\d\d) (\d\d):(\d\d):(\d\d)\s*$")
+
+
+def parse_tweet(tweet_line):
+    """Return the same tweet dictionary as make_tweet, only faster.
+    The date is read with a precompiled pattern and turned into a datetime
+    directly instead of going through strptime. Raises ValueError if the
+    line is not formatted as in all_tweets.txt or its location is not a
+    latitude and longitude
+
+    """
+    # The location is between the [ at the start of the line and the first ]
+    end = tweet_line.find("]")
+    if not tweet_line.startswith("[") or end < 0:
+        raise ValueError("No location in tweet line: " + repr(tweet_line))
+    loc_array = tweet_line[1:end].split(",")
+    if len(loc_array) != 2:
+        raise ValueError("Bad location in tweet line: " + repr(tweet_line))
+    lat = float(loc_array[0])
+    lon = float(loc_array[1])
+    # float also reads nan and inf, which can't be geocoded. The comparisons
+    # are false for nan so it is caught too
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError("Location out of range in tweet line: " + repr(tweet_line))
+    # The 23 characters after the location hold the date and time
+    data = TWEET_TIME.match(tweet_line, end + 1, end + 24)
+    if data is None:
+        raise ValueError("Bad date in tweet line: " + repr(tweet_line))
+    year, month, day, hour, minute, second = data.groups()
+    date = datetime(int(year), int(month), int(day), int(hour), int(minute), int(second))
+    tweet = {"text": tweet_line[end + 24:], "time": date, "lat": lat, "lon": lon}
+    return tweet
+
+
+def tweet_text(tweet):
+    """Return the text of a tweet as a string"""
+    # Take the value associated with the "text" key
+    return tweet["text"]
+
+
+# Translation table for the UTF-8 bytes of lowercase text. Letters and '
+# are kept and every other byte becomes a space, including all the bytes of
+# characters that are not ASCII, so the words are the same as those left by
+# replacing [^a-z ']+ with a space
+WORD_BYTES = bytes(bytearray([code if (97 <= code <= 122 or code == 39) else 32
+                              for code in range(256)]))
+
+
+def split_words(text):
+    """Return a list of the words in text, in lowercase and not including
+    punctuation. Translating the bytes of the text is about twice as fast as
+    a regular expression"""
+    text = text.lower().encode("utf-8", "replace").translate(WORD_BYTES)
+    return text.decode("ascii").split()
+
+
+def add_words(tweet):
+    """Split the text of a tweet into words once and keep them in its words
+    key, as a tuple of interned strings so repeated words share memory"""
+    tweet["words"] = tuple([intern(word) for word in split_words(tweet["text"])])
+    return tweet
+
+
+def tweet_words(tweet):
+    """Return a list of the words in the text of a tweet not
+    including punctuation."""
+    # Use the words kept by add_words if the tweet has them
+    if "words" in tweet:
+        return tweet["words"]
+    # Otherwise split the text of the tweet now
+    return split_words(tweet["text"])
+
+
+def tweet_time(tweet):
+    """Return the datetime that represents when the tweet was posted."""
+    # Take the value associated with the "time" key
+    return tweet["time"]
+
+
+def timestamp(when):
+    """Return a datetime as whole seconds since 1970, the way a TweetTable
+    keeps times"""
+    return calendar.timegm(when.timetuple())
+
+
+def parse_time(text):
+    """Return the datetime written as YYYY-MM-DD or YYYY-MM-DD HH:MM:SS"""
+    text = text.strip()
+    if len(text) == 10:
+        return datetime.strptime(text, "%Y-%m-%d")
+    return datetime.strptime(text, "%Y-%m-%d %H:%M:%S")
+
+
+def tweet_location(tweet):
+    """Return an tuple that represents the tweet's location."""
+    # Create a tupple of the latitude and longitude
+    location = (float(tweet["lat"]), float(tweet["lon"]))
+    return location
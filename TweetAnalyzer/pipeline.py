@@ -0,0 +1,625 @@
+"""Analyzing a file of tweets a chunk at a time: parsing, geocoding and
+scoring them, caching the results and splitting the work between processes"""
+import os
+import io
+import time
+import locale
+import multiprocessing
+import struct
+import hashlib
+import json
+import logging
+
+from .parser import add_words, parse_tweet
+from .table import TweetTable, read_tweet_table, write_tweet_table
+from .geocoder import ZIPS_FILE, add_geo, load_gazetteer
+from .scoring import assign_sentiments, compile_sentiments, load_sentiments
+from .query import index_tweets, tweet_filter
+
+
+def write_tweets(tweets, outfile, format="text"):
+    """writes the list of tweets to a text file with name outfile and
+    returns the number of tweets written. With format "table" the tweets
+    are written as a binary tweet table file instead, see write_tweet_table.
+    outfile can also be a file that is already open, it is left open"""
+    if format == "table":
+        return write_tweet_table(tweets, outfile)
+    if format != "text":
+        raise ValueError("Unknown tweet file format: " + str(format))
+    # Create an outout file
+    if hasattr(outfile, "write"):
+        f = outfile
+    else:
+        f = open(outfile, 'w')
+    count = 0
+    # For each tweet in the array of tweets write it out to the output file,
+    # tweets can also be a generator so they are never all in memory
+    for tweet in tweets:
+        # The words are only kept to save splitting the text again
+        if "words" in tweet:
+            tweet = dict(tweet)
+            del tweet["words"]
+        # write each dictionary plus a new line character
+        f.write(str(tweet) + '\n')
+        count += 1
+    # Close the file, unless it was given already open
+    if f is not outfile:
+        f.close()
+    # Return how many tweets were written
+    return count
+
+
+def read_tweets(lines, counts=None):
+    """Generate a tweet dictionary for each line in lines, which can be an
+    open file of tweets or any other iterable of lines. The words of each
+    tweet are split once here with add_words. Lines that can't be
+    parsed are skipped, if counts is a dictionary the number of tweets read
+    and lines skipped are added to its "parsed" and "malformed" keys"""
+    if counts is not None:
+        counts.setdefault("parsed", 0)
+        counts.setdefault("malformed", 0)
+    for line in lines:
+        try:
+            tweet = add_words(parse_tweet(line))
+        except ValueError:
+            # Blank lines are not worth counting
+            if counts is not None and line.strip():
+                counts["malformed"] += 1
+            continue
+        if counts is not None:
+            counts["parsed"] += 1
+        yield tweet
+
+
+def chunk_tweets(tweets, chunk_size):
+    """Generate lists of up to chunk_size tweets from the iterable tweets"""
+    chunk = []
+    for tweet in tweets:
+        chunk.append(tweet)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    # The last chunk can be shorter
+    if chunk:
+        yield chunk
+
+
+class ResultsCache(object):
+    """Analyzed chunks of tweets kept on disk so the same lines are never
+    geocoded and scored twice.
+
+    Each chunk of lines is stored as a tweet table file named after a hash of
+    the lines, the sentiment lexicon and the zip code file, so a change to
+    any of them misses the cache. Files that are used have their time
+    updated, and when the cache grows past max_bytes the least recently used
+    files are removed first. max_bytes of None means no limit.
+
+    """
+
+    # Changes whenever the way the results are worked out does
+    VERSION = "2"
+
+    def __init__(self, directory, max_bytes=None, zip_file=ZIPS_FILE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.zip_file = zip_file
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, lines, lexicon, precision=None):
+        """Return the name of the cache entry for a chunk of lines. precision
+        is that of the GeoMemo the chunk is geocoded with, rounded locations
+        can be given different zip codes so they are kept apart"""
+        info = os.stat(self.zip_file)
+        digest = hashlib.sha1()
+        digest.update(("%s %s %d %d %s\n" % (self.VERSION, lexicon.version, info.st_size,
+                                             int(info.st_mtime * 1000000), precision)).encode("ascii"))
+        for line in lines:
+            digest.update(line.encode("utf-8", "surrogateescape"))
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ".tt")
+
+    def get(self, key):
+        """Return the TweetTable stored for key, or None if there isn't one"""
+        path = self.path(key)
+        try:
+            table = read_tweet_table(path)
+            # Mark the entry as recently used
+            os.utime(path, None)
+        except (IOError, OSError, ValueError, struct.error):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return table
+
+    def put(self, key, table):
+        """Store a TweetTable for key, then make room if the cache is too big"""
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        path = self.path(key)
+        # Write to a temporary file first so no one ever reads half an entry
+        tempname = "%s.%d.tmp" % (path, os.getpid())
+        write_tweet_table(table, tempname)
+        os.replace(tempname, path)
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries until the cache is no
+        bigger than max_bytes"""
+        if self.max_bytes is None:
+            return
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(".tt"):
+                continue
+            try:
+                info = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((info.st_mtime, info.st_size, name))
+            total += info.st_size
+        for mtime, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+            total -= size
+
+
+def default_cache_directory():
+    """Return the directory results are cached in when none is chosen"""
+    return os.path.join(os.path.expanduser("~"), ".cache", "tweet_analyzer")
+
+
+class AnalysisCancelled(Exception):
+    """Raised by a progress callback to stop analyze_tweets or analyze_file"""
+
+
+def count_lines(filename):
+    """Return the number of lines in the file filename, reading it in large
+    blocks so it is quick enough to run before analyzing it"""
+    count = 0
+    f = open(filename, 'rb')
+    try:
+        block = f.read(1 << 20)
+        while block:
+            count += block.count(b"\n")
+            last = block
+            block = f.read(1 << 20)
+            # A last line without a new line is still a line
+            if not block and not last.endswith(b"\n"):
+                count += 1
+    finally:
+        f.close()
+    return count
+
+
+class PipelineStats(object):
+    """Timings and counters collected while analyzing tweets.
+
+    Each stage (parse, geocode, score, filter and so on) gets its total wall
+    clock time, CPU time and number of items, and counters record how many
+    lines could not be parsed, how many tweets were too far from any zip
+    code, had no sentiment or passed the filters. Pass one to analyze_tweets
+    or analyze_file as stats and read it afterwards with report or log
+
+    """
+
+    enabled = True
+
+    def __init__(self):
+        # Stage name to [wall seconds, cpu seconds, items]
+        self.stages = {}
+        # Counter name to number, read_tweets keeps its counts here too
+        self.counters = {}
+
+    def stage(self, name, items=0):
+        """Return a context manager that adds the time spent inside it to
+        the stage name. Its items attribute can be changed inside"""
+        return StageTimer(self, name, items)
+
+    def add_stage(self, name, wall, cpu, items):
+        if name not in self.stages:
+            self.stages[name] = [0.0, 0.0, 0]
+        totals = self.stages[name]
+        totals[0] += wall
+        totals[1] += cpu
+        totals[2] += items
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def merge(self, report):
+        """Add in a report from another PipelineStats, like the ones sent
+        back by worker processes"""
+        for name, stage in report["stages"].items():
+            self.add_stage(name, stage["wall_seconds"], stage["cpu_seconds"], stage["items"])
+        for name, amount in report["counters"].items():
+            self.count(name, amount)
+
+    def report(self):
+        """Return the stages and counters as a dictionary of plain values"""
+        stages = {}
+        for name, (wall, cpu, items) in self.stages.items():
+            rate = None
+            if wall > 0 and items:
+                rate = items / wall
+            stages[name] = {"wall_seconds": wall, "cpu_seconds": cpu, "items": items, "items_per_second": rate}
+        return {"stages": stages, "counters": dict(self.counters)}
+
+    def log(self, logger=None):
+        """Write one JSON log line per stage and one for the counters"""
+        if logger is None:
+            logger = logging.getLogger("TweetAnalyzer")
+        report = self.report()
+        for name in sorted(report["stages"]):
+            line = dict(report["stages"][name])
+            line["event"] = "stage"
+            line["stage"] = name
+            logger.info(json.dumps(line, sort_keys=True))
+        line = dict(report["counters"])
+        line["event"] = "counters"
+        logger.info(json.dumps(line, sort_keys=True))
+
+
+class StageTimer(object):
+    """Times one stage of a PipelineStats, see PipelineStats.stage"""
+
+    __slots__ = ("stats", "name", "items", "wall", "cpu")
+
+    def __init__(self, stats, name, items):
+        self.stats = stats
+        self.name = name
+        self.items = items
+
+    def __enter__(self):
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        return self
+
+    def __exit__(self, kind, value, traceback):
+        self.stats.add_stage(self.name, time.perf_counter() - self.wall, time.process_time() - self.cpu, self.items)
+        return False
+
+
+class NullStats(object):
+    """Stands in for a PipelineStats when none was asked for, so that
+    collecting nothing costs next to nothing"""
+
+    enabled = False
+
+    def stage(self, name, items=0):
+        return NULL_STAGE
+
+    def count(self, name, amount=1):
+        pass
+
+
+class NullStage(object):
+    """Does nothing, for NullStats.stage"""
+
+    items = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, kind, value, traceback):
+        return False
+
+
+NULL_STATS = NullStats()
+NULL_STAGE = NullStage()
+
+
+def count_results(stats, tweets):
+    """Count the tweets with no zip code and no sentiment in stats"""
+    outside = 0
+    missing = 0
+    for tweet in tweets:
+        if tweet["zip"] == "N/A":
+            outside += 1
+        if tweet["sentiment"] is None:
+            missing += 1
+    stats.count("outside_cutoff", outside)
+    stats.count("no_sentiment", missing)
+
+
+def analyze_tweets(lines, sentiments, chunk_size=10000, engine="index", counts=None, cache=None, progress=None,
+                   stats=None, memo=None, **kwargs):
+    """Generate the tweets in lines with their zip code, state and sentiment
+    added, keeping only the ones that pass tweet_filter with the filters in
+    kwargs. Only chunk_size tweets are held in memory at a time. counts is
+    passed on to read_tweets
+
+    With a ResultsCache, chunks of chunk_size lines that were analyzed before
+    are loaded from the cache and only new chunks are analyzed, so running
+    again on a file that has had lines added only analyzes its last chunks
+
+    progress is called after each chunk with the number of lines analyzed so
+    far. It can raise AnalysisCancelled to stop the analysis
+
+    stats is a PipelineStats to time each stage and count the results in
+
+    memo is a GeoMemo passed on to add_geo, it is kept from chunk to chunk
+
+    """
+    if stats is None:
+        stats = NULL_STATS
+    elif counts is None:
+        counts = stats.counters
+    # Compile the sentiments once rather than for every chunk
+    sentiments = compile_sentiments(sentiments)
+    done = 0
+    for linechunk in chunk_tweets(lines, chunk_size):
+        table = None
+        if cache is not None:
+            with stats.stage("cache_lookup", len(linechunk)):
+                key = cache.key(linechunk, sentiments, memo.precision if memo is not None else None)
+                table = cache.get(key)
+            if table is not None:
+                stats.count("cache_hits")
+                if counts is not None:
+                    # Work out the counts read_tweets would have made
+                    counts["parsed"] = counts.get("parsed", 0) + len(table)
+                    lines_read = len([line for line in linechunk if line.strip()])
+                    counts["malformed"] = counts.get("malformed", 0) + lines_read - len(table)
+                chunk = table
+            else:
+                stats.count("cache_misses")
+        if table is None:
+            # Each stage works on the chunk like it would on a whole list,
+            # a chunk for the cache is analyzed as a table which is also how
+            # it is stored
+            with stats.stage("parse", len(linechunk)):
+                chunk = read_tweets(linechunk, counts)
+                if cache is not None:
+                    chunk = TweetTable(chunk)
+                else:
+                    chunk = list(chunk)
+            with stats.stage("geocode", len(chunk)):
+                if memo is not None:
+                    hits, misses = memo.hits, memo.misses
+                chunk = add_geo(chunk, engine, memo)
+            if memo is not None:
+                stats.count("geo_memo_hits", memo.hits - hits)
+                stats.count("geo_memo_misses", memo.misses - misses)
+            with stats.stage("score", len(chunk)):
+                chunk = assign_sentiments(chunk, sentiments)
+            if cache is not None:
+                with stats.stage("cache_store", len(chunk)):
+                    cache.put(key, chunk)
+        if stats.enabled:
+            count_results(stats, chunk)
+        with stats.stage("filter", len(chunk)):
+            chunk = tweet_filter(chunk, **kwargs)
+        stats.count("kept", len(chunk))
+        done += len(linechunk)
+        if progress is not None:
+            progress(done)
+        for tweet in chunk:
+            yield tweet
+
+
+class AnalyzedCorpus(object):
+    """Every tweet in a tweet file analyzed with one sentiment file and kept
+    in memory as an indexed TweetTable, so any number of filters and rankings
+    can be run on it without reading or analyzing the files again"""
+
+    def __init__(self, tweet_file, sentiments_file, engine="index", cache=None, progress=None, stats=None,
+                 memo=None):
+        self.tweet_file = tweet_file
+        self.sentiments_file = sentiments_file
+        sentiments = load_sentiments(sentiments_file)
+        f = open(tweet_file, 'r')
+        try:
+            tweets = TweetTable(analyze_tweets(f, sentiments, engine=engine, cache=cache, progress=progress,
+                                               stats=stats, memo=memo))
+        finally:
+            f.close()
+        if stats is None:
+            stats = NULL_STATS
+        with stats.stage("word_index", len(tweets)):
+            self.tweets = index_tweets(tweets)
+
+    def __len__(self):
+        return len(self.tweets)
+
+    def matches(self, tweet_file, sentiments_file):
+        """Return True if the corpus was made from these files"""
+        return self.tweet_file == tweet_file and self.sentiments_file == sentiments_file
+
+    def filter(self, **kwargs):
+        """Return the tweets that pass tweet_filter with the filters in kwargs"""
+        return tweet_filter(self.tweets, **kwargs)
+
+
+def split_file(filename, parts):
+    """Return a list of up to parts (start, end) byte ranges that cover the
+    file filename, each one starting at the beginning of a line"""
+    size = os.path.getsize(filename)
+    starts = [0]
+    f = open(filename, 'rb')
+    for part in range(1, parts):
+        # Move each split forward to the start of the next line
+        f.seek(size * part // parts)
+        f.readline()
+        start = f.tell()
+        if starts[-1] < start < size:
+            starts.append(start)
+    f.close()
+    return [(starts[count], (starts + [size])[count + 1]) for count in range(len(starts))]
+
+
+def read_range(filename, start, end):
+    """Generate the lines of the file filename that start in the byte range
+    from start to end. Line endings are translated like they are when the
+    file is opened in text mode, so the lines are the same as a single
+    process reads"""
+    encoding = locale.getpreferredencoding(False)
+    f = open(filename, 'rb')
+    try:
+        f.seek(start)
+        position = start
+        while position < end:
+            line = f.readline()
+            if not line:
+                break
+            position += len(line)
+            text = line.decode(encoding)
+            if "\r" in text:
+                # \r\n and a lone \r end a line too with universal newlines
+                for part in io.StringIO(text, newline=None):
+                    yield part
+            else:
+                yield text
+    finally:
+        f.close()
+
+
+# The sentiments used by the worker processes of analyze_file. They are set
+# once per worker by _start_worker, a forked worker simply inherits them
+_worker_sentiments = None
+
+
+def _start_worker(sentiments):
+    """Get a worker process of analyze_file ready to analyze tweets"""
+    global _worker_sentiments
+    _worker_sentiments = sentiments
+    # Load the gazetteer now, a forked worker already has it
+    load_gazetteer()
+
+
+def _analyze_part(task):
+    """Analyze the tweets in one byte range of a file and write them to a
+    file of their own. Returns the name of that file, how many tweets were
+    written to it, the counts from read_tweets, the number of lines read and
+    a PipelineStats report if one was asked for"""
+    infile, start, end, partfile, chunk_size, engine, format, cache, timed, memo, kwargs = task
+    # The counts from read_tweets are kept apart from the stats counters,
+    # the caller decides where each of them goes
+    counts = {}
+    stats = None
+    if timed:
+        stats = PipelineStats()
+    lines = read_range(infile, start, end)
+    # Keep the number of lines read, for progress reports
+    done = [0]
+
+    def record(lines):
+        done[0] = lines
+
+    count = write_tweets(analyze_tweets(lines, _worker_sentiments, chunk_size, engine, counts, cache, record,
+                                        stats, memo, **kwargs),
+                         partfile, format)
+    report = None
+    if stats is not None:
+        report = stats.report()
+    return partfile, count, counts, done[0], report
+
+
+def analyze_file(infile, sentiments, outfile, chunk_size=10000, engine="index", counts=None, workers=1,
+                 format="text", cache=None, progress=None, stats=None, memo=None, **kwargs):
+    """Analyze the tweets in the file infile with analyze_tweets and write
+    the ones that pass the filters in kwargs to outfile. The file is read and
+    written as it goes so any size of file can be analyzed. Returns the number
+    of tweets written. format is passed on to write_tweets, a tweet table file
+    is written in one go at the end. cache and progress are passed on to
+    analyze_tweets, if progress cancels the analysis outfile is removed
+
+    stats is a PipelineStats to time each stage and count the results in.
+    The stats of every worker process are added together. Each worker starts
+    with a copy of the GeoMemo memo
+
+    With workers greater than 1 (or None for one per CPU) the file is split
+    into byte ranges that are analyzed by a pool of processes. The tweets are
+    written in the same order as with a single process
+
+    """
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    try:
+        return _analyze_file(infile, sentiments, outfile, chunk_size, engine, counts, workers, format, cache,
+                             progress, stats, memo, kwargs)
+    except AnalysisCancelled:
+        # Don't leave half an output file behind
+        if os.path.exists(outfile):
+            os.remove(outfile)
+        raise
+
+
+def _analyze_file(infile, sentiments, outfile, chunk_size, engine, counts, workers, format, cache, progress, stats,
+                  memo, kwargs):
+    """Do the work of analyze_file"""
+    if workers <= 1:
+        f = open(infile, 'r')
+        try:
+            count = write_tweets(analyze_tweets(f, sentiments, chunk_size, engine, counts, cache, progress, stats,
+                                                memo, **kwargs),
+                                 outfile, format)
+        finally:
+            f.close()
+        return count
+    # Like analyze_tweets, the counts from read_tweets go to the stats when
+    # there is nowhere else for them
+    if counts is None and stats is not None:
+        counts = stats.counters
+    # Load the gazetteer before the pool starts so forked workers share it
+    load_gazetteer()
+    tasks = []
+    for part, (start, end) in enumerate(split_file(infile, workers)):
+        partfile = "%s.part%d" % (outfile, part)
+        tasks.append((infile, start, end, partfile, chunk_size, engine, format, cache, stats is not None, memo,
+                      kwargs))
+    # Forked workers get the sentiments and gazetteer without any copying
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    else:
+        context = multiprocessing.get_context()
+    pool = None
+    out = None
+    count = 0
+    done = 0
+    try:
+        if format == "table":
+            out = TweetTable()
+        else:
+            out = open(outfile, 'w')
+        pool = context.Pool(min(workers, len(tasks)), _start_worker, (sentiments,))
+        # imap gives back the parts in order, so they are joined in order
+        for partfile, partcount, partcounts, partlines, report in pool.imap(_analyze_part, tasks):
+            if format == "table":
+                out.extend(read_tweet_table(partfile))
+            else:
+                part = open(partfile, 'r')
+                for line in part:
+                    out.write(line)
+                part.close()
+            os.remove(partfile)
+            count += partcount
+            if counts is not None:
+                for key in partcounts:
+                    counts[key] = counts.get(key, 0) + partcounts[key]
+            if stats is not None:
+                stats.merge(report)
+            done += partlines
+            if progress is not None:
+                progress(done)
+        if format == "table":
+            write_tweet_table(out, outfile)
+    finally:
+        if out is not None and format != "table":
+            out.close()
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        # Don't leave the parts of a cancelled or failed run behind, the
+        # parts that were joined have already been removed
+        for task in tasks:
+            if os.path.exists(task[3]):
+                os.remove(task[3])
+    return count
@@ -0,0 +1,517 @@
+"""Indexes of analyzed tweets, filters and the sentiment statistics of
+states, zip codes and time buckets"""
+from datetime import datetime, timedelta
+import os
+from bisect import bisect_left
+import heapq
+from array import array
+
+from .optional import load_numpy
+from .parser import timestamp, tweet_time, tweet_words
+from .table import EPOCH, HAS_SENTIMENT, TweetTable
+
+
+# The state abbreviations that come with TweetAnalyzer, next to the package
+# like the zip codes
+STATES_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "states.txt")
+
+
+class WordIndex(object):
+    """Inverted index of the words in a list of tweets. Each word maps to a
+    posting list, the positions in the list of the tweets containing it in
+    increasing order"""
+
+    def __init__(self, tweets):
+        postings = {}
+        for count in range(len(tweets)):
+            # A word is only listed once per tweet
+            for word in set(tweet_words(tweets[count])):
+                if word in postings:
+                    postings[word].append(count)
+                else:
+                    postings[word] = [count]
+        self.postings = postings
+        self.size = len(tweets)
+
+    def positions(self, word):
+        """Return the positions of the tweets containing word"""
+        return self.postings.get(word, [])
+
+    def all_of(self, words):
+        """Return the positions of the tweets containing every one of words"""
+        lists = sorted([self.positions(word) for word in words], key=len)
+        # Every tweet contains all of no words, the same as a scan
+        if not lists:
+            return list(range(self.size))
+        # Start from the shortest posting list, it bounds the answer
+        found = lists[0]
+        for positions in lists[1:]:
+            if not found:
+                break
+            positions = set(positions)
+            found = [count for count in found if count in positions]
+        return found
+
+    def any_of(self, words):
+        """Return the positions of the tweets containing any of words"""
+        found = set()
+        for word in words:
+            found.update(self.positions(word))
+        return sorted(found)
+
+
+class TimeIndex(object):
+    """The times of a list of tweets in increasing order, along with the
+    position of the tweet each one belongs to, so the tweets posted in a
+    range of time are found with two binary searches"""
+
+    def __init__(self, tweets):
+        if isinstance(tweets, TweetTable):
+            times = tweets.times
+        else:
+            times = array("q", [timestamp(tweet_time(tweet)) for tweet in tweets])
+        # Tweets usually come in the order they were posted, which sorted
+        # gets through in one pass
+        self.order = array("q", sorted(range(len(times)), key=times.__getitem__))
+        self.times = array("q", [times[count] for count in self.order])
+
+    def span(self, start=None, end=None):
+        """Return the first and last place in the sorted order of the tweets
+        posted from start up to but not including end, datetimes or seconds
+        since 1970. None leaves that side open"""
+        first = 0
+        last = len(self.times)
+        if start is not None:
+            if isinstance(start, datetime):
+                start = timestamp(start)
+            first = bisect_left(self.times, start)
+        if end is not None:
+            if isinstance(end, datetime):
+                end = timestamp(end)
+            last = bisect_left(self.times, end, first)
+        return first, last
+
+    def between(self, start=None, end=None):
+        """Return the positions of the tweets posted from start up to but not
+        including end, in the order the tweets are in"""
+        first, last = self.span(start, end)
+        return sorted(self.order[first:last])
+
+
+class IndexedTweets(list):
+    """A list of tweets along with a WordIndex of their words, kept in the
+    word_index attribute, and a TimeIndex of their times in time_index. The
+    word and time filters use the indexes instead of reading every tweet.
+    The indexes are made when the list is, so tweets should not be added or
+    removed afterwards"""
+
+    def __init__(self, tweets):
+        list.__init__(self, tweets)
+        self.word_index = WordIndex(self)
+        self.time_index = TimeIndex(self)
+
+
+def index_tweets(tweets):
+    """Return the tweets as an IndexedTweets list, or for a TweetTable the
+    same table with a WordIndex in its word_index attribute and a TimeIndex
+    in its time_index attribute"""
+    if isinstance(tweets, TweetTable):
+        tweets.word_index = WordIndex(tweets)
+        tweets.time_index = TimeIndex(tweets)
+        return tweets
+    return IndexedTweets(tweets)
+
+
+def find_tweets_containing(word, tweets):
+    """Search tweets for ones containing specified word.
+    Returns list of tweets with specified word
+
+    """
+    # Look the word up if the tweets have been indexed
+    index = getattr(tweets, "word_index", None)
+    if index is not None:
+        return [tweets[count] for count in index.positions(word)]
+    # Create an array for the found tweets
+    foundtweets = []
+    # For each tweet check if the work exists
+    for tweet in tweets:
+        for x in tweet_words(tweet):
+            # If the word given is in the tweet add it to the
+            # array of found tweets
+            if x == word:
+                foundtweets.append(tweet)
+                # Exit the for loop on the first instance so the tweet isn't
+                # added twice if the word occurs more than once
+                break
+    # Return the list of found tweets
+    return foundtweets
+
+
+def find_tweets_containing_all(words, tweets):
+    """Search tweets for ones containing every one of the given words.
+    Returns list of tweets with all of the words
+
+    """
+    index = getattr(tweets, "word_index", None)
+    if index is not None:
+        return [tweets[count] for count in index.all_of(words)]
+    words = set(words)
+    return [tweet for tweet in tweets if words.issubset(tweet_words(tweet))]
+
+
+def find_tweets_containing_any(words, tweets):
+    """Search tweets for ones containing at least one of the given words.
+    Returns list of tweets with any of the words
+
+    """
+    index = getattr(tweets, "word_index", None)
+    if index is not None:
+        return [tweets[count] for count in index.any_of(words)]
+    words = set(words)
+    return [tweet for tweet in tweets if not words.isdisjoint(tweet_words(tweet))]
+
+
+def find_tweets_from_state(state, tweets):
+    """Search tweets for ones from a specified state.
+    Returns list of tweets from the specified state
+
+    """
+    # A table can compare the codes of the states instead
+    if isinstance(tweets, TweetTable):
+        return [tweets[count] for count in tweets.positions_with("state", state)]
+    # Create an array for the found tweets
+    foundtweets = []
+    for tweet in tweets:
+        # Check each tweet to see is from the state being filtered
+        if tweet["state"] == state:
+            # Add it to the array of found tweets
+            foundtweets.append(tweet)
+    # return the list of found tweets
+    return foundtweets
+
+
+def find_tweets_from_zip(zip, tweets):
+    """Search tweets for ones from a specified zip code.
+     Returns list of tweets from the specified zip code
+
+     """
+    # A table can compare the codes of the zip codes instead
+    if isinstance(tweets, TweetTable):
+        return [tweets[count] for count in tweets.positions_with("zip", zip)]
+    # Create an array for the found tweets
+    foundtweets = []
+    # For each tweet in the array of tweets check if the zip code
+    # matches the one being filtered
+    for tweet in tweets:
+        if tweet["zip"] == zip:
+            # If it is add it to the array of found tweets
+            foundtweets.append(tweet)
+    # return the list of found tweets
+    return foundtweets
+
+
+def find_tweets_between(start, end, tweets):
+    """Search tweets for ones posted from the datetime start up to but not
+    including the datetime end. Either one can be None to leave that side
+    open. Returns list of tweets posted in that time
+
+    """
+    index = getattr(tweets, "time_index", None)
+    if index is not None:
+        return [tweets[count] for count in index.between(start, end)]
+    foundtweets = []
+    for tweet in tweets:
+        posted = tweet_time(tweet)
+        if (start is None or posted >= start) and (end is None or posted < end):
+            foundtweets.append(tweet)
+    return foundtweets
+
+
+def tweet_filter(tweets, **kwargs):
+    """Filter tweets based on a given word, zip code, state,
+     or a combination of the 3. all_words and any_words take a list of
+     words the tweets must all contain or contain at least one of. since
+     and until keep the tweets posted from since up to but not including
+     until. The word and time filters use the indexes of IndexedTweets
+     when there are some
+
+     """
+    # If the user gives a word to filter by run the filter by the word
+    if "word" in kwargs:
+        tweets = find_tweets_containing(kwargs["word"], tweets)
+    # The lists of words are also filtered first, while any index still applies
+    if "all_words" in kwargs:
+        tweets = find_tweets_containing_all(kwargs["all_words"], tweets)
+    if "any_words" in kwargs:
+        tweets = find_tweets_containing_any(kwargs["any_words"], tweets)
+    # Then the time, with the index when no word filter was used
+    if "since" in kwargs or "until" in kwargs:
+        tweets = find_tweets_between(kwargs.get("since"), kwargs.get("until"), tweets)
+    # If the user gives a zip code to filter by run the filter by the zip code
+    if "zip" in kwargs:
+        tweets = find_tweets_from_zip(kwargs["zip"], tweets)
+    # If the user gives a state to filter by run the filter by the state
+    if "state" in kwargs:
+        tweets = find_tweets_from_state(kwargs["state"], tweets)
+    # Return the filtered tweets
+    return tweets
+
+
+def find_average_sentiment(tweets):
+    """Calculate the average sentiment of each tweet in the given dictionary,
+    return a dictionary with the same data and the sentiment value appended
+
+    """
+
+    # Set a variable for the sentimenttotal, initilize it to 0
+    sentimenttotal = 0
+    totaltweets = len(tweets)
+    for tweet in tweets:
+        # For each tweet if the sentiment value is not None add it
+        # to the sentimenttotal
+        if tweet["sentiment"] != None:
+            sentimenttotal += tweet["sentiment"]
+    # Calculate the average
+    averagesentiment = (sentimenttotal / totaltweets)
+    # Return the average
+    return averagesentiment
+
+
+def create_state_database(filename):
+    """Create a database of states from the given filename. Return an array
+     containing each state. It is assumed that the input file has one state
+     abbreviation on each line
+
+     """
+    # Create a array for the states
+    states = []
+    # Open the given file in read mode
+    f = open(filename, 'r')
+    # For each line add it in the file add the state to the array of states
+    for line in f:
+        # Strip all new line characters and other whitespace that might exist
+        line = line.strip()
+        # Add it to the list of states
+        states.append(line)
+    return states
+
+
+def group_sentiments(tweets, word=None, key="state"):
+    """Return a dictionary with the total sentiment and the number of tweets
+    for each value of key ("state" or "zip") in the tweets, counting only the
+    tweets containing word when one is given. Every tweet is read once
+
+    """
+    # Tweets with no sentiment count towards the number of tweets but not
+    # the total, like in find_average_sentiment
+    groups = group_sentiment_stats(tweets, word, key)
+    return dict((group, [groups[group][0], groups[group][2]]) for group in groups)
+
+
+def rank_sentiments(tweets, word=None, key="state", groups=None):
+    """Return a list of (group, average sentiment, number of tweets) tuples
+    for each state or zip code, from the most positive to the most negative.
+    groups limits the table to a list of states or zip codes, which also
+    decides the order of groups with the same average. Groups without any
+    tweets are left out
+
+    """
+    totals = group_sentiments(tweets, word, key)
+    if groups is None:
+        groups = sorted(totals)
+    table = []
+    for group in groups:
+        if group in totals:
+            total, count = totals[group]
+            table.append((group, total / count, count))
+    # sorted keeps the order of groups with the same average
+    return sorted(table, key=lambda row: -row[1])
+
+
+def group_sentiment_stats(tweets, word=None, key="state"):
+    """Return a dictionary with a list for each value of key ("state" or
+    "zip") in the tweets: the total sentiment, the number of tweets with a
+    sentiment and the number of tweets, counting only the tweets containing
+    word when one is given. Every tweet is read once, and for a TweetTable
+    with NumPy the columns are added up without reading the tweets at all
+
+    """
+    if isinstance(tweets, TweetTable) and load_numpy() is not None and len(tweets):
+        return _table_sentiment_stats(tweets, word, key)
+    if word is not None:
+        tweets = find_tweets_containing(word, tweets)
+    groups = {}
+    for tweet in tweets:
+        group = tweet[key]
+        if group not in groups:
+            groups[group] = [0, 0, 0]
+        stats = groups[group]
+        if tweet["sentiment"] != None:
+            stats[0] += tweet["sentiment"]
+            stats[1] += 1
+        stats[2] += 1
+    return groups
+
+
+def _table_sentiment_stats(table, word, key):
+    """group_sentiment_stats for a TweetTable, with NumPy"""
+    numpy = load_numpy()
+    if word is None:
+        positions = numpy.arange(len(table))
+    elif table.word_index is not None:
+        positions = numpy.array(table.word_index.positions(word), dtype=numpy.intp)
+    else:
+        positions = numpy.array([count for count in range(len(table)) if word in table.value(count, "words")],
+                                dtype=numpy.intp)
+    if key == "zip":
+        codes, names = table.zips, table.zip_names
+    else:
+        codes, names = table.states, table.state_names
+    codes = numpy.frombuffer(codes, dtype=numpy.int32)[positions]
+    sentiments = numpy.frombuffer(table.sentiments, dtype=numpy.float64)[positions]
+    flags = numpy.frombuffer(table.flags, dtype=numpy.uint8)[positions]
+    # Tweets without a zip code and state can't be grouped
+    known = codes >= 0
+    codes = codes[known]
+    sentiments = sentiments[known]
+    scored = ((flags[known] & HAS_SENTIMENT) != 0) & (sentiments == sentiments)
+    size = len(names)
+    # bincount adds the sentiments of each group in order, like the loop
+    totals = numpy.bincount(codes[scored], weights=sentiments[scored], minlength=size).tolist()
+    scoredcounts = numpy.bincount(codes[scored], minlength=size).tolist()
+    counts = numpy.bincount(codes, minlength=size).tolist()
+    return dict((names[code], [totals[code], scoredcounts[code], counts[code]])
+                for code in range(size) if counts[code])
+
+
+def top_sentiments(tweets, k=5, word=None, key="state", min_count=1, groups=None):
+    """Return two lists of (group, average sentiment, number of tweets with a
+    sentiment, number of tweets) tuples for the states or zip codes: the k
+    most positive, most positive first, and the k most negative, most
+    negative first. k of None gives every group in both.
+
+    Unlike rank_sentiments, the average is only over the tweets that have a
+    sentiment and there is no 0 baseline, so a state shows up however the
+    others compare. Groups with fewer than min_count tweets with a sentiment
+    are left out. groups limits the lists to a list of states or zip codes,
+    which also decides the order of groups with the same average. Without
+    groups every state or zip code is ranked, but not the N/A of tweets
+    too far from every zip code
+
+    """
+    totals = group_sentiment_stats(tweets, word, key)
+    if groups is None:
+        groups = sorted(group for group in totals if group != "N/A")
+    rows = []
+    for order, group in enumerate(groups):
+        if group in totals:
+            total, scored, count = totals[group]
+            if scored >= max(min_count, 1):
+                rows.append((group, total / scored, scored, count, order))
+    if k is None:
+        k = len(rows)
+    # A heap only keeps k rows at a time however many groups there are
+    top = heapq.nsmallest(k, rows, key=lambda row: (-row[1], row[4]))
+    bottom = heapq.nsmallest(k, rows, key=lambda row: (row[1], row[4]))
+    return [row[:4] for row in top], [row[:4] for row in bottom]
+
+
+# Lengths in seconds of the time buckets of sentiment_trend
+BUCKETS = {"minute": 60, "hour": 3600, "day": 86400, "week": 7 * 86400}
+
+
+def group_sentiments_by_time(tweets, bucket="day", word=None, key="state", start=None, end=None):
+    """Return a dictionary with the total sentiment and the number of tweets
+    for each (time bucket, state or zip code) pair, like group_sentiments.
+    bucket is one of BUCKETS or a number of seconds, buckets are given by
+    their start in seconds since 1970, days start at midnight UTC and weeks
+    on Monday. Only
+    the tweets posted from start up to but not including end are counted,
+    which with a TimeIndex are found without reading the others. Tweets too
+    far from every zip code, with N/A for key, are left out
+
+    """
+    if bucket in BUCKETS:
+        width = BUCKETS[bucket]
+    elif isinstance(bucket, (int, float)) and not isinstance(bucket, bool) and bucket > 0:
+        width = bucket
+    else:
+        raise ValueError("Unknown bucket: " + str(bucket))
+    # 1970 started on a Thursday, the Monday before was 3 days earlier
+    origin = 0
+    if bucket == "week":
+        origin = -3 * 86400
+    # The positions of the tweets containing word, None for every tweet
+    positions = None
+    if word is not None:
+        words = getattr(tweets, "word_index", None)
+        if words is not None:
+            positions = set(words.positions(word))
+        else:
+            positions = set([count for count in range(len(tweets)) if word in tweet_words(tweets[count])])
+    index = getattr(tweets, "time_index", None)
+    if index is None:
+        index = TimeIndex(tweets)
+    first, last = index.span(start, end)
+    groups = {}
+    order = index.order
+    times = index.times
+    for place in range(first, last):
+        count = order[place]
+        if positions is not None and count not in positions:
+            continue
+        tweet = tweets[count]
+        if tweet[key] == "N/A":
+            continue
+        group = (times[place] - (times[place] - origin) % width, tweet[key])
+        if group not in groups:
+            groups[group] = [0, 0]
+        sentiment = tweet["sentiment"]
+        if sentiment != None:
+            groups[group][0] += sentiment
+        groups[group][1] += 1
+    return groups
+
+
+def sentiment_trend(tweets, bucket="day", word=None, key="state", start=None, end=None):
+    """Return a list of (bucket start, group, average sentiment, number of
+    tweets) tuples in time order, the average sentiment of each state or zip
+    code in each bucket of time. The bucket start is a datetime, see
+    group_sentiments_by_time for the rest
+
+    """
+    totals = group_sentiments_by_time(tweets, bucket, word, key, start, end)
+    trend = []
+    for (seconds, group) in sorted(totals):
+        total, count = totals[(seconds, group)]
+        trend.append((EPOCH + timedelta(seconds=seconds), group, total / count, count))
+    return trend
+
+
+def most_positive(tweets, word):
+    """Find the state which has the most positive sentiment about a given
+    word, return the state as an abbreviation
+
+    """
+    # Rank all 50 states at once
+    table = rank_sentiments(tweets, word, "state", create_state_database(STATES_FILE))
+    # Only a state with a positive average counts
+    if table and table[0][1] > 0:
+        return table[0][0]
+    return ""
+
+
+def most_negative(tweets, word):
+    """Find the state which has the most negative sentiment about a
+    given word, return the state as an abbreviation
+
+    """
+    # Rank all 50 states at once
+    table = rank_sentiments(tweets, word, "state", create_state_database(STATES_FILE))
+    # Only a state with a negative average counts, if several share the
+    # lowest average the first one in states.txt is kept
+    if table and table[-1][1] < 0:
+        for state, sentiment, count in table:
+            if sentiment == table[-1][1]:
+                return state
+    return ""
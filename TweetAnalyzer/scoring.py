@@ -0,0 +1,540 @@
+"""Sentiment lexicons and the engines that score tweets with them"""
+from re import compile as compile_regex
+import csv
+import os
+import time
+import mmap
+import struct
+import hashlib
+from array import array
+from bisect import bisect_left
+
+from .optional import load_numpy
+from .parser import split_words, tweet_words
+from .table import HAS_SENTIMENT, INT_SENTIMENT, TweetTable
+
+
+def create_sentiment_database(filename):
+    """Create a database of the sentiment value associated with the given csv
+    file. It is assumed that the input file is a csv file with the first value
+    being the word and the second value being the sentiment value
+
+    """
+    # Read the values from the input filename
+    f = open(filename)
+    reader = csv.reader(f)
+    sentiment = {}
+    # For each line read from the CSV file add it to the dictionary of
+    # sentiments...the word is the key
+    for each in reader:
+        sentiment[each[0]] = float(each[1])
+    f.close()
+    # Return the dictionary of sentiments
+    return sentiment
+
+
+# Matches the entries of a sentiment database that are not a single word
+# as split_words would give it
+NOT_WORD = compile_regex(r"[^a-z']")
+
+# Key of the code of the phrase that ends at a node of a phrase trie, words
+# are never empty so it can't be mistaken for one
+PHRASE_END = ""
+
+
+class SentimentLexicon(object):
+    """A sentiment database compiled for scoring many tweets at once. Every
+    word gets a code, 0 is kept for words that are not in the database, and
+    scores[code] is the sentiment of the word with that code. It can still be
+    used like the dictionary it was made from
+
+    Entries of more than one word, like "not good" or "can't wait", are
+    phrases. They are split into words with split_words and kept in a trie,
+    phrases maps the first word of each phrase to a node that maps the next
+    word to the next node, and the node for the last word has the code of
+    the phrase under PHRASE_END. See match for how they are found.
+
+    """
+
+    def __init__(self, sentiments):
+        numpy = load_numpy()
+        self._sentiments = sentiments
+        self._version = None
+        self._terms = None
+        self._words = None
+        self._codes = {}
+        self.phrases = {}
+        scores = [0.0]
+        for word in sentiments:
+            self._codes[word] = len(scores)
+            if NOT_WORD.search(word):
+                self.add_phrase(word, len(scores))
+            scores.append(sentiments[word])
+        # The NumPy sums are only the same as adding up the values in Python
+        # when every value is a float
+        self.floats = all([isinstance(score, float) for score in scores])
+        if numpy is not None:
+            self.scores = numpy.array(scores, dtype=float)
+        else:
+            self.scores = scores
+
+    @classmethod
+    def from_arrays(cls, words, scores, phrases=(), version=None):
+        """Return a SentimentLexicon of a list of words and a sequence of
+        float scores one longer, starting with the 0.0 for unknown words.
+        phrases are the codes of the words that are phrases. words can also
+        be SortedTerms, which are looked up where they are until the
+        dictionary of codes is needed. version is the lexicon's version if
+        it is already known"""
+        numpy = load_numpy()
+        lexicon = cls.__new__(cls)
+        lexicon._terms = None
+        lexicon._words = None
+        lexicon._codes = None
+        if isinstance(words, SortedTerms):
+            lexicon._terms = words
+        else:
+            lexicon._words = words
+        lexicon.phrases = {}
+        for code in phrases:
+            lexicon.add_phrase(lexicon.word(code), code)
+        lexicon.floats = True
+        if numpy is not None:
+            lexicon.scores = numpy.frombuffer(scores, dtype=float)
+        else:
+            lexicon.scores = memoryview(scores).tolist()
+        # The dictionary of sentiments is only made if it is used
+        lexicon._sentiments = None
+        lexicon._version = version
+        return lexicon
+
+    @property
+    def codes(self):
+        """The dictionary of words and their codes"""
+        if self._codes is None:
+            words = self.words
+            self._codes = dict(zip(words, range(1, len(words) + 1)))
+        return self._codes
+
+    @property
+    def words(self):
+        """The list of words in the lexicon in the order of their codes,
+        starting with code 1"""
+        if self._words is None:
+            if self._terms is not None:
+                self._words = [self._terms.word(code) for code in range(1, len(self._terms) + 1)]
+            else:
+                self._words = sorted(self._codes, key=self._codes.get)
+        return self._words
+
+    def code(self, word):
+        """Return the code of word, or 0 if it isn't in the lexicon"""
+        if self._codes is None and self._terms is not None:
+            return self._terms.find(word)
+        return self.codes.get(word, 0)
+
+    def word(self, code):
+        """Return the word with code"""
+        if self._words is None and self._terms is not None:
+            return self._terms.word(code)
+        return self.words[code - 1]
+
+    def add_phrase(self, entry, code):
+        """Add entry to the phrase trie with code, if it is a phrase"""
+        words = split_words(entry)
+        if len(words) < 2:
+            return
+        node = self.phrases
+        for word in words:
+            if word not in node:
+                node[word] = {}
+            node = node[word]
+        # If two entries are the same phrase once split, the last one wins
+        # like it does for a repeated word
+        node[PHRASE_END] = code
+
+    def match(self, words):
+        """Return the codes of the entries in a list of words, from left to
+        right, with 0 for words that aren't in the lexicon. Where phrases
+        start the longest one that matches is used and its words are not
+        matched again. Each word is only looked at once unless it starts a
+        phrase, however many phrases there are"""
+        codes = self.codes
+        if not self.phrases:
+            return [codes.get(word, 0) for word in words]
+        starts = self.phrases
+        found = []
+        position = 0
+        count = len(words)
+        while position < count:
+            word = words[position]
+            node = starts.get(word)
+            if node is not None:
+                # Follow the trie as far as the words go, remembering the
+                # last node where a phrase ended
+                code = 0
+                end = position
+                step = position + 1
+                while node is not None:
+                    if PHRASE_END in node:
+                        code = node[PHRASE_END]
+                        end = step
+                    if step == count:
+                        break
+                    node = node.get(words[step])
+                    step += 1
+                if code:
+                    found.append(code)
+                    position = end
+                    continue
+            found.append(codes.get(word, 0))
+            position += 1
+        return found
+
+    @property
+    def sentiments(self):
+        """The dictionary of words and sentiments in the lexicon"""
+        if self._sentiments is None:
+            self._sentiments = dict(zip(self.words, [float(score) for score in self.scores[1:]]))
+        return self._sentiments
+
+    @property
+    def version(self):
+        """A hash of the words and values of the lexicon, which changes
+        whenever any of them do"""
+        if self._version is None:
+            items = sorted((word, repr(self.sentiments[word])) for word in self.sentiments)
+            self._version = hashlib.sha1(repr(items).encode("utf-8", "surrogateescape")).hexdigest()
+        return self._version
+
+    def __getstate__(self):
+        # Words left in a memory mapped file can't be pickled, processes
+        # started with spawn get them as a list
+        state = dict(self.__dict__)
+        if self._terms is not None:
+            state["_words"] = self.words
+            state["_terms"] = None
+        return state
+
+    def __contains__(self, word):
+        return self.code(word) != 0
+
+    def __getitem__(self, word):
+        if self._sentiments is not None:
+            return self._sentiments[word]
+        code = self.code(word)
+        if not code:
+            raise KeyError(word)
+        return float(self.scores[code])
+
+    def __iter__(self):
+        return iter(self.sentiments)
+
+    def __len__(self):
+        return len(self.scores) - 1
+
+
+class SortedTerms(object):
+    """The words of a compiled lexicon file, left in the memory mapped file.
+    They are sorted by their UTF-8 bytes and word offsets[position] to
+    offsets[position + 1] of text is the word with code position + 1, so a
+    word is found with a binary search without decoding any of the others"""
+
+    def __init__(self, offsets, text):
+        self.offsets = offsets
+        self.text = text
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, position):
+        # The UTF-8 bytes of a word, so bisect can search the words
+        return self.text[self.offsets[position]:self.offsets[position + 1]].tobytes()
+
+    def find(self, word):
+        """Return the code of word, or 0 if it isn't one of the words"""
+        key = word.encode("utf-8", "surrogateescape")
+        position = bisect_left(self, key)
+        if position < len(self) and self[position] == key:
+            return position + 1
+        return 0
+
+    def word(self, code):
+        """Return the word with code"""
+        return self[code - 1].decode("utf-8", "surrogateescape")
+
+
+def compile_sentiments(sentiments):
+    """Return sentiments as a SentimentLexicon, if it isn't one already"""
+    if isinstance(sentiments, SentimentLexicon):
+        return sentiments
+    return SentimentLexicon(sentiments)
+
+
+# Layout of the header of a compiled lexicon file: a marker, the version of
+# the layout, the size and modification time of the csv file it was made
+# from, the number of words, the number of phrases and the SentimentLexicon
+# version as a SHA-1 digest, padded to a multiple of 8 bytes. It is followed
+# by the scores of the words as float64, starting with the 0.0 of unknown
+# words, the codes of the phrases as int32, the offsets of the words as
+# uint32, each padded to a multiple of 8 bytes, and then the words as UTF-8
+# text sorted by their bytes, see SortedTerms
+LEXICON_HEADER = struct.Struct("=4sIqqII20s4x")
+LEXICON_MAGIC = b"TASL"
+LEXICON_VERSION = 3
+
+# Lexicons that have already been loaded, by file name, along with the
+# size and modification time of the file they were loaded from
+_lexicons = {}
+
+
+def write_lexicon_cache(lexicon, filename, cachename):
+    """Save a SentimentLexicon made from the csv file filename to cachename
+    so it can be loaded again without reading the csv. The words get new
+    codes in the order of their UTF-8 bytes"""
+    encoded = sorted((word.encode("utf-8", "surrogateescape"), word) for word in lexicon.words)
+    codes = dict((word, code) for code, (text, word) in enumerate(encoded, 1))
+    info = os.stat(filename)
+    # The phrases are kept in the order they were added, so the same one
+    # wins when two entries are the same phrase once split
+    phrases = array("i", [codes[word] for word in lexicon.words if NOT_WORD.search(word)])
+    offsets = array("I", [0])
+    for text, word in encoded:
+        offsets.append(offsets[-1] + len(text))
+    header = LEXICON_HEADER.pack(LEXICON_MAGIC, LEXICON_VERSION, info.st_size, int(info.st_mtime * 1000000),
+                                 len(encoded), len(phrases), bytes.fromhex(lexicon.version))
+    # Write to a temporary file first so no one ever reads half a cache
+    tempname = cachename + ".tmp"
+    f = open(tempname, 'wb')
+    f.write(header)
+    f.write(array("d", [0.0] + [float(lexicon[word]) for text, word in encoded]).tobytes())
+    f.write(phrases.tobytes())
+    f.write(b"\0" * (-len(phrases) * 4 % 8))
+    f.write(offsets.tobytes())
+    f.write(b"\0" * (-len(offsets) * 4 % 8))
+    f.write(b"".join([text for text, word in encoded]))
+    f.close()
+    os.replace(tempname, cachename)
+    return True
+
+
+def read_lexicon_cache(filename, cachename):
+    """Return the SentimentLexicon saved in cachename by write_lexicon_cache,
+    or None if there is no cache or it was not made from the current
+    filename. The scores and words stay in the memory mapped file"""
+    try:
+        info = os.stat(filename)
+        f = open(cachename, 'rb')
+    except (IOError, OSError):
+        return None
+    try:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, mmap.error):
+        f.close()
+        return None
+    f.close()
+    if len(data) < LEXICON_HEADER.size:
+        return None
+    magic, version, size, mtime, count, phrasecount, digest = LEXICON_HEADER.unpack_from(data)
+    # The cache is stale if the csv file changed since it was written
+    if (magic != LEXICON_MAGIC or version != LEXICON_VERSION or
+            size != info.st_size or mtime != int(info.st_mtime * 1000000)):
+        return None
+    view = memoryview(data)
+    offset = LEXICON_HEADER.size
+    scores = view[offset:offset + 8 * (count + 1)].cast("d")
+    offset += 8 * (count + 1)
+    phrases = view[offset:offset + 4 * phrasecount].cast("i")
+    offset += 4 * phrasecount + (-phrasecount * 4 % 8)
+    offsets = view[offset:offset + 4 * (count + 1)].cast("I")
+    offset += 4 * (count + 1) + (-(count + 1) * 4 % 8)
+    terms = SortedTerms(offsets, view[offset:])
+    return SentimentLexicon.from_arrays(terms, scores, phrases, digest.hex())
+
+
+def load_sentiments(filename):
+    """Return the SentimentLexicon for the sentiment csv file filename. It
+    is loaded from a compiled file next to the csv when one is up to date,
+    otherwise the csv is read (which then refreshes the compiled file), and
+    is only loaded again in the same process when the csv changes"""
+    info = os.stat(filename)
+    stamp = (info.st_size, info.st_mtime)
+    if filename in _lexicons and _lexicons[filename][0] == stamp:
+        return _lexicons[filename][1]
+    cachename = filename + ".lexicon"
+    lexicon = read_lexicon_cache(filename, cachename)
+    if lexicon is None:
+        lexicon = SentimentLexicon(create_sentiment_database(filename))
+        try:
+            write_lexicon_cache(lexicon, filename, cachename)
+        except (IOError, OSError):
+            # A read only directory only means the next run is slower
+            pass
+    _lexicons[filename] = (stamp, lexicon)
+    return lexicon
+
+
+def sum_sentiments_numpy(codes, lengths, lexicon):
+    """Return an array of the total sentiment of each tweet. codes are the
+    word codes of all the tweets one after another and lengths the number of
+    words in each tweet. The scores are added in the same order as in
+    assign_sentiments, words that are not in the lexicon add 0.0 which leaves
+    the total unchanged, so the totals are exactly the same"""
+    numpy = load_numpy()
+    tweet_of_word = numpy.repeat(numpy.arange(len(lengths)), lengths)
+    return numpy.bincount(tweet_of_word, weights=lexicon.scores[codes], minlength=len(lengths))
+
+
+def clamp_sentiments_numpy(totals):
+    """Return three arrays for the totals from sum_sentiments_numpy: the
+    totals limited to between -1 and 1, whether each total was 0 (no
+    sentiment) and whether it had to be limited"""
+    numpy = load_numpy()
+    return numpy.clip(totals, -1, 1), totals == 0, (totals > 1) | (totals < -1)
+
+
+def assign_sentiments_numpy(tweets, lexicon, chunk_size=10000):
+    """Assign each tweet the same sentiment as assign_sentiments, working out
+    chunk_size tweets at a time with NumPy"""
+    numpy = load_numpy()
+    if isinstance(tweets, TweetTable):
+        return assign_table_sentiments_numpy(tweets, lexicon)
+    for start in range(0, len(tweets), chunk_size):
+        chunk = tweets[start:start + chunk_size]
+        # Turn the words of the chunk into one array of codes
+        matches = [lexicon.match(tweet_words(tweet)) for tweet in chunk]
+        lengths = numpy.array([len(found) for found in matches], dtype=numpy.intp)
+        wordcodes = numpy.array([code for found in matches for code in found], dtype=numpy.intp)
+        values, missing, limited = clamp_sentiments_numpy(sum_sentiments_numpy(wordcodes, lengths, lexicon))
+        # Give back None for no sentiment and whole numbers for limited ones
+        values = values.tolist()
+        missing = missing.tolist()
+        limited = limited.tolist()
+        for count in range(len(chunk)):
+            if missing[count]:
+                chunk[count]["sentiment"] = None
+            elif limited[count]:
+                chunk[count]["sentiment"] = int(values[count])
+            else:
+                chunk[count]["sentiment"] = values[count]
+    return tweets
+
+
+def assign_table_sentiments_numpy(table, lexicon):
+    """Assign each tweet in a TweetTable its sentiment. The table already
+    has the codes of its words, so the whole table is scored at once and the
+    results are written straight into its columns"""
+    numpy = load_numpy()
+    n = len(table)
+    if n == 0:
+        return table
+    # Score of each word in the table's vocabulary
+    vocabulary = numpy.array([lexicon.codes.get(word, 0) for word in table.vocabulary] or [0],
+                             dtype=numpy.intp)
+    words = numpy.frombuffer(table.words, dtype=numpy.int32)
+    wordcodes = vocabulary[words]
+    lengths = numpy.diff(numpy.frombuffer(table.word_offsets, dtype=numpy.int64))
+    totals = sum_sentiments_numpy(wordcodes, lengths, lexicon)
+    if lexicon.phrases:
+        # Tweets with the first two words of a phrase next to each other are
+        # matched again one at a time, the others can't have any phrases
+        size = len(table.vocabulary)
+        codes = table.word_codes
+        pairs = [codes[first] * size + codes[second] for first in lexicon.phrases if first in codes
+                 for second in lexicon.phrases[first] if second in codes]
+        tweet_of_word = numpy.repeat(numpy.arange(n), lengths)
+        found = numpy.isin(words[:-1].astype(numpy.int64) * size + words[1:], pairs)
+        found &= tweet_of_word[:-1] == tweet_of_word[1:]
+        offsets = table.word_offsets
+        names = table.vocabulary
+        phrased = numpy.unique(tweet_of_word[:-1][found]).tolist()
+        matches = [lexicon.match([names[code] for code in table.words[offsets[count]:offsets[count + 1]]])
+                   for count in phrased]
+        totals[phrased] = sum_sentiments_numpy(
+            numpy.array([code for found in matches for code in found], dtype=numpy.intp),
+            numpy.array([len(found) for found in matches], dtype=numpy.intp), lexicon)
+    values, missing, limited = clamp_sentiments_numpy(totals)
+    values[missing] = numpy.nan
+    # Write through views of the columns, dropped before returning so the
+    # table can grow again
+    sentiments = numpy.frombuffer(table.sentiments, dtype=numpy.float64)
+    flags = numpy.frombuffer(table.flags, dtype=numpy.uint8)
+    sentiments[:] = values
+    flags &= ~numpy.uint8(INT_SENTIMENT)
+    flags |= HAS_SENTIMENT
+    flags[limited] |= INT_SENTIMENT
+    del sentiments, flags
+    return table
+
+
+def assign_sentiments(tweets, sentiments, engine="numpy"):
+    """Assign each tweet a sentiment value between 1 and -1
+
+    engine chooses how the sentiments are worked out:
+    numpy  -- score a whole TweetTable at once from its word codes (the
+              default). A list of tweets has to be turned into codes one
+              tweet at a time, which is slower than the python engine, so
+              lists are scored with that. It is also used when NumPy is not
+              installed or the sentiment values are not all floats
+    python -- add up the values of the words of one tweet at a time
+
+    Entries of several words are matched as phrases, see
+    SentimentLexicon.match
+
+    """
+    if engine not in ("numpy", "python"):
+        raise ValueError("Unknown sentiment engine: " + str(engine))
+    lexicon = compile_sentiments(sentiments)
+    if engine == "numpy" and isinstance(tweets, TweetTable) and lexicon.floats and load_numpy() is not None:
+        return assign_table_sentiments_numpy(tweets, lexicon)
+    # A plain dictionary, rather than looking every word up through the
+    # lexicon
+    sentiments = lexicon.sentiments
+    # The entry of each code, for the phrases found by match
+    if lexicon.phrases:
+        entries = [None] * len(lexicon.scores)
+        for word in lexicon.codes:
+            entries[lexicon.codes[word]] = word
+    # For each tweet in the given array calculate and add a sentiment
+    for tweet in tweets:
+        # Get the words in each tweet
+        tweettext = tweet_words(tweet)
+        # Swap the words of phrases for the phrases
+        if lexicon.phrases:
+            tweettext = [entries[code] for code in lexicon.match(tweettext) if code]
+        # Initilize a vairable for sentiment value, initially there
+        # should be no sentiment
+        sentimentvalue = 0
+        for word in tweettext:
+            # Check to see if each word is in the sentiments databse
+            if word in sentiments:
+                # If it is add it to the sentimentvalue
+                sentimentvalue += sentiments[word]
+        # At the end if the sentiment is 0 make the sentiment equal None
+        if sentimentvalue == 0:
+            tweet["sentiment"] = None
+        # If the sentiment is greater than 1 set the value to 1
+        elif sentimentvalue > 1:
+            tweet["sentiment"] = 1
+        # If the sentiment is less than -1 set the value to -1
+        elif sentimentvalue < -1:
+            tweet["sentiment"] = -1
+        # Otherwise set the sentiment value to the calculated sentiment value
+        else:
+            tweet["sentiment"] = sentimentvalue
+    # Return the dictionary with the sentiments added
+    return tweets
+
+
+def scoring_throughput(tweets, sentiments, engine="numpy", repeat=3):
+    """Return how many tweets per second assign_sentiments scores with the
+    given engine, the best of repeat runs over tweets"""
+    lexicon = compile_sentiments(sentiments)
+    best = None
+    for count in range(repeat):
+        start = time.time()
+        assign_sentiments(tweets, lexicon, engine)
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return len(tweets) / max(best, 1e-9)
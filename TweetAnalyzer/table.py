@@ -0,0 +1,339 @@
+"""Columnar storage of tweets and the tweet table files they are saved in"""
+from datetime import datetime, timedelta
+import mmap
+import struct
+from array import array
+
+from .parser import timestamp, tweet_words
+
+
+# Times are kept as whole seconds since this moment
+EPOCH = datetime(1970, 1, 1)
+
+# Bits of TweetTable.flags, saying which keys a tweet has
+HAS_GEO = 1
+HAS_SENTIMENT = 2
+# Set when the sentiment was a whole number, like the 1 and -1 of a clamped
+# sentiment, so it reads back as an int and the tweet prints the same
+INT_SENTIMENT = 4
+
+
+class TweetRow(object):
+    """A view of one tweet in a TweetTable that behaves like the tweet
+    dictionary it was made from. Setting the zip, state or sentiment keys
+    updates the table"""
+
+    __slots__ = ("table", "position")
+
+    def __init__(self, table, position):
+        self.table = table
+        self.position = position
+
+    def keys(self):
+        """Return the keys of the tweet, in the order a tweet dictionary has them"""
+        keys = ["text", "time", "lat", "lon"]
+        flags = self.table.flags[self.position]
+        if flags & HAS_GEO:
+            keys.extend(["zip", "state"])
+        if flags & HAS_SENTIMENT:
+            keys.append("sentiment")
+        keys.append("words")
+        return keys
+
+    def __getitem__(self, key):
+        return self.table.value(self.position, key)
+
+    def __setitem__(self, key, value):
+        self.table.set_value(self.position, key, value)
+
+    def __contains__(self, key):
+        if key in ("zip", "state"):
+            return bool(self.table.flags[self.position] & HAS_GEO)
+        if key == "sentiment":
+            return bool(self.table.flags[self.position] & HAS_SENTIMENT)
+        return key in ("text", "time", "lat", "lon", "words")
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    def __eq__(self, other):
+        if isinstance(other, (dict, TweetRow)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        if equal is NotImplemented:
+            return equal
+        return not equal
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
+class TweetTable(object):
+    """A list of tweets stored one column per key instead of one dictionary
+    per tweet, which takes several times less memory.
+
+    Locations and sentiments are arrays of floats, times are whole seconds
+    since EPOCH, states and zip codes are codes into lists of names, the
+    texts are one UTF-8 buffer with offsets and the words are codes into a
+    vocabulary. Indexing the table gives a TweetRow, so it can be used
+    anywhere a list of tweet dictionaries is expected.
+
+    """
+
+    def __init__(self, tweets=()):
+        self.lats = array("d")
+        self.lons = array("d")
+        self.times = array("q")
+        self.sentiments = array("d")
+        self.flags = bytearray()
+        # Codes of the zip code and state of each tweet, -1 when not known
+        self.zips = array("i")
+        self.states = array("i")
+        self.zip_names = []
+        self.zip_codes = {}
+        self.state_names = []
+        self.state_codes = {}
+        # The texts one after another, tweet i is text[offsets[i]:offsets[i + 1]]
+        self.text = bytearray()
+        self.text_offsets = array("q", [0])
+        # The words of tweet i are words[word_offsets[i]:word_offsets[i + 1]]
+        self.words = array("i")
+        self.word_offsets = array("q", [0])
+        self.vocabulary = []
+        self.word_codes = {}
+        # Set by index_tweets
+        self.word_index = None
+        self.time_index = None
+        self.extend(tweets)
+
+    def __len__(self):
+        return len(self.lats)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [TweetRow(self, count) for count in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("tweet index out of range")
+        return TweetRow(self, position)
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield TweetRow(self, position)
+
+    def append(self, tweet):
+        """Add a tweet dictionary (or TweetRow) to the end of the table"""
+        # Any index no longer covers every tweet
+        self.word_index = None
+        self.time_index = None
+        self.lats.append(float(tweet["lat"]))
+        self.lons.append(float(tweet["lon"]))
+        self.times.append(timestamp(tweet["time"]))
+        text = tweet["text"].encode("utf-8", "surrogateescape")
+        self.text.extend(text)
+        self.text_offsets.append(len(self.text))
+        for word in tweet_words(tweet):
+            self.words.append(self.code(word, self.vocabulary, self.word_codes))
+        self.word_offsets.append(len(self.words))
+        self.flags.append(0)
+        self.zips.append(-1)
+        self.states.append(-1)
+        self.sentiments.append(0.0)
+        position = len(self) - 1
+        for key in ("zip", "state", "sentiment"):
+            if key in tweet:
+                self.set_value(position, key, tweet[key])
+
+    def extend(self, tweets):
+        """Add each tweet in tweets to the end of the table"""
+        for tweet in tweets:
+            self.append(tweet)
+
+    def code(self, name, names, codes):
+        """Return the code of name in the list names, adding it if it is new"""
+        if name not in codes:
+            codes[name] = len(names)
+            names.append(name)
+        return codes[name]
+
+    def value(self, position, key):
+        """Return the value of key for the tweet at position"""
+        if key == "text":
+            start = self.text_offsets[position]
+            end = self.text_offsets[position + 1]
+            return bytes(self.text[start:end]).decode("utf-8", "surrogateescape")
+        if key == "time":
+            return EPOCH + timedelta(seconds=self.times[position])
+        if key == "lat":
+            return self.lats[position]
+        if key == "lon":
+            return self.lons[position]
+        if key == "words":
+            start = self.word_offsets[position]
+            end = self.word_offsets[position + 1]
+            vocabulary = self.vocabulary
+            return tuple([vocabulary[code] for code in self.words[start:end]])
+        flags = self.flags[position]
+        if key in ("zip", "state") and flags & HAS_GEO:
+            if key == "zip":
+                return self.zip_names[self.zips[position]]
+            return self.state_names[self.states[position]]
+        if key == "sentiment" and flags & HAS_SENTIMENT:
+            sentiment = self.sentiments[position]
+            # A missing sentiment is kept as nan
+            if sentiment != sentiment:
+                return None
+            if flags & INT_SENTIMENT:
+                return int(sentiment)
+            return sentiment
+        raise KeyError(key)
+
+    def set_value(self, position, key, value):
+        """Set the zip, state or sentiment of the tweet at position"""
+        if key == "zip":
+            self.zips[position] = self.code(value, self.zip_names, self.zip_codes)
+        elif key == "state":
+            self.states[position] = self.code(value, self.state_names, self.state_codes)
+        elif key == "sentiment":
+            flags = self.flags[position] | HAS_SENTIMENT
+            if value is None:
+                self.sentiments[position] = float("nan")
+                flags &= ~INT_SENTIMENT
+            else:
+                self.sentiments[position] = value
+                if isinstance(value, int):
+                    flags |= INT_SENTIMENT
+                else:
+                    flags &= ~INT_SENTIMENT
+            self.flags[position] = flags
+            return
+        else:
+            raise KeyError("Only the zip, state and sentiment of a tweet can be changed: " + str(key))
+        # A tweet gets its zip code and state together in add_geo
+        if self.zips[position] >= 0 and self.states[position] >= 0:
+            self.flags[position] |= HAS_GEO
+
+    def positions_with(self, key, name):
+        """Return the positions of the tweets whose zip or state is name"""
+        if key == "zip":
+            codes, lookup = self.zips, self.zip_codes
+        else:
+            codes, lookup = self.states, self.state_codes
+        if name not in lookup:
+            return []
+        code = lookup[name]
+        return [count for count in range(len(codes)) if codes[count] == code]
+
+
+def make_tweet_table(tweets):
+    """Return a TweetTable holding the given tweet dictionaries"""
+    return TweetTable(tweets)
+
+
+# Tweet table files
+#
+# A tweet table file holds the columns of a TweetTable so analyzed tweets
+# can be loaded again without geocoding and scoring them again. All numbers
+# are in the byte order of the machine that wrote the file. It starts with
+# TABLE_HEADER: the marker TATT, the layout version and the number of tweets
+# n. Then come these sections, each one is its length in bytes as an int64
+# followed by its bytes, padded with zeros to a multiple of 8 bytes:
+#
+#   lats, lons          n float64
+#   times               n int64, seconds since EPOCH
+#   sentiments          n float64, nan for no sentiment
+#   flags               n uint8, HAS_GEO, HAS_SENTIMENT and INT_SENTIMENT
+#   zips, states        n int32, codes into zip names and state names
+#   text offsets        n + 1 int64
+#   text                UTF-8 text of all the tweets
+#   word offsets        n + 1 int64
+#   words               int32 codes into the vocabulary
+#   zip names, state names, vocabulary
+#                       UTF-8 text, one name per line
+
+TABLE_HEADER = struct.Struct("=4sIq")
+TABLE_MAGIC = b"TATT"
+TABLE_VERSION = 1
+# Type code of each numeric section, in order
+TABLE_COLUMNS = (("lats", "d"), ("lons", "d"), ("times", "q"), ("sentiments", "d"),
+                 ("flags", "B"), ("zips", "i"), ("states", "i"), ("text_offsets", "q"),
+                 ("text", "B"), ("word_offsets", "q"), ("words", "i"))
+TABLE_NAMES = ("zip_names", "state_names", "vocabulary")
+
+
+def write_tweet_table(tweets, outfile):
+    """Write the tweets to the file outfile as a tweet table file and return
+    the number of tweets written. Each column is written in one piece.
+    outfile can also be a binary file that is already open, it is left open"""
+    if not isinstance(tweets, TweetTable):
+        tweets = TweetTable(tweets)
+    if hasattr(outfile, "write"):
+        f = outfile
+    else:
+        f = open(outfile, 'wb')
+    try:
+        f.write(TABLE_HEADER.pack(TABLE_MAGIC, TABLE_VERSION, len(tweets)))
+        sections = [memoryview(getattr(tweets, name)).cast("B") for name, code in TABLE_COLUMNS]
+        for name in TABLE_NAMES:
+            sections.append(u"\n".join(getattr(tweets, name)).encode("utf-8", "surrogateescape"))
+        for data in sections:
+            f.write(struct.pack("=q", len(data)))
+            f.write(data)
+            f.write(b"\0" * (-len(data) % 8))
+    finally:
+        if f is not outfile:
+            f.close()
+    return len(tweets)
+
+
+def read_tweet_table(filename):
+    """Return the TweetTable in a tweet table file. The file is memory
+    mapped and the columns of the table are views of it, so only the parts
+    that are used get read. The zip codes, states and sentiments can still be
+    changed, privately, but tweets can't be added to the table"""
+    f = open(filename, 'rb')
+    try:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    finally:
+        f.close()
+    magic, version, count = TABLE_HEADER.unpack_from(data)
+    if magic != TABLE_MAGIC or version != TABLE_VERSION:
+        raise ValueError("Not a tweet table file: " + filename)
+    view = memoryview(data)
+    offset = TABLE_HEADER.size
+    sections = []
+    for section in range(len(TABLE_COLUMNS) + len(TABLE_NAMES)):
+        length, = struct.unpack_from("=q", data, offset)
+        offset += 8
+        sections.append(view[offset:offset + length])
+        offset += length + (-length % 8)
+    table = TweetTable.__new__(TweetTable)
+    for (name, code), section in zip(TABLE_COLUMNS, sections):
+        setattr(table, name, section.cast(code))
+    for name, section in zip(TABLE_NAMES, sections[len(TABLE_COLUMNS):]):
+        text = bytes(section).decode("utf-8", "surrogateescape")
+        setattr(table, name, text.split(u"\n") if text else [])
+    table.zip_codes = dict((name, code) for code, name in enumerate(table.zip_names))
+    table.state_codes = dict((name, code) for code, name in enumerate(table.state_names))
+    table.word_codes = dict((name, code) for code, name in enumerate(table.vocabulary))
+    table.word_index = None
+    table.time_index = None
+    return table
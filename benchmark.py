@@ -0,0 +1,357 @@
+"""Benchmarks for each stage of TweetAnalyzer.
+
+Synthetic tweets are placed around the zip codes in zips.csv (with some
+spread out over the whole world, like a global stream), given words from a
+synthetic vocabulary and scored with a synthetic lexicon. Each stage runs in
+a process of its own so its peak memory can be measured, and the results
+are printed as JSON so runs of different versions can be compared:
+
+    python benchmark.py --sizes 1000,100000 --output results.json
+
+Most stages read the tweets a batch at a time. The ones that need every
+tweet at once only use the first CORPUS_LIMIT tweets of a file, so their
+items are capped at that for larger sizes.
+
+"""
+from datetime import datetime, timedelta
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+import TweetAnalyzer
+
+
+# Stages that look for the closest zip by checking every zip code are only
+# run on this many tweets, they would take hours on a large file
+BRUTE_LIMIT = 50
+
+# Number of items timed together when working out latencies
+BATCH_SIZE = 250
+
+# Stages that need every tweet in memory at once (the word index, filters
+# and ranking) only use this many tweets of larger files. The other stages
+# read the file a batch at a time, so they work on files of any size
+CORPUS_LIMIT = 1000000
+
+# Number of different words the filter and rank stages look for, each one
+# a scan of up to CORPUS_LIMIT tweets without the word index
+FILTER_WORDS = 20
+
+
+def make_vocabulary(size, rng):
+    """Return a list of size made up words"""
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(letters) for count in range(rng.randint(2, 9))))
+    return sorted(words)
+
+
+def generate_lexicon(filename, vocabulary, rng, fraction=0.1):
+    """Write a sentiment csv file giving a fraction of the vocabulary a
+    sentiment value between -1 and 1"""
+    f = open(filename, 'w')
+    for word in vocabulary:
+        if rng.random() < fraction:
+            f.write("%s,%.3f\n" % (word, rng.uniform(-1, 1)))
+    f.close()
+
+
+def generate_tweets(filename, count, vocabulary, rng, outside=0.2):
+    """Write count tweet lines formatted as in all_tweets.txt. Most of them
+    are near a zip code, the fraction outside are anywhere in the world"""
+    gazetteer = TweetAnalyzer.load_gazetteer()
+    start = datetime(2011, 8, 1)
+    f = open(filename, 'w')
+    for line in range(count):
+        if rng.random() < outside:
+            lat = rng.uniform(-60, 75)
+            lon = rng.uniform(-180, 180)
+        else:
+            position = rng.randrange(len(gazetteer))
+            lat = gazetteer.lats[position] + rng.gauss(0, 0.05)
+            lon = gazetteer.lons[position] + rng.gauss(0, 0.05)
+        posted = start + timedelta(seconds=rng.randrange(14 * 24 * 3600))
+        words = [rng.choice(vocabulary) for word in range(rng.randint(3, 20))]
+        f.write("[%f, %f]\t6\t%s\t%s\n" % (lat, lon, posted.strftime("%Y-%m-%d %H:%M:%S"),
+                                            " ".join(words).capitalize()))
+    f.close()
+
+
+def percentile(values, fraction):
+    """Return the value below which the given fraction of values fall"""
+    values = sorted(values)
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class Timer(object):
+    """Times batches of a stage and works out its throughput and latencies"""
+
+    def __init__(self):
+        self.batches = []
+
+    def time(self, function, items, count=None):
+        """Call function(items) and record how long it took per item, or
+        per count items if the call does count operations"""
+        start = time.perf_counter()
+        result = function(items)
+        elapsed = time.perf_counter() - start
+        if count is None:
+            count = len(items)
+        self.batches.append((elapsed, count))
+        return result
+
+    def report(self):
+        """Return the timings as a dictionary"""
+        seconds = sum(elapsed for elapsed, items in self.batches)
+        items = sum(items for elapsed, items in self.batches)
+        latencies = [elapsed / items * 1e6 for elapsed, items in self.batches if items]
+        return {"items": items, "seconds": seconds,
+                "throughput": items / seconds if seconds else None,
+                "latency_us": {"p50": percentile(latencies, 0.5), "p90": percentile(latencies, 0.9),
+                               "p99": percentile(latencies, 0.99)}}
+
+
+def batches(files, geo=False, scored=False):
+    """Generate the tweets of the benchmark file BATCH_SIZE at a time, parsed
+    and tokenized, with their zip codes and sentiments added if asked for.
+    Only one batch is held in memory at a time so any size of file can be
+    used"""
+    if scored:
+        sentiments = TweetAnalyzer.compile_sentiments(TweetAnalyzer.create_sentiment_database(files["lexicon"]))
+    f = open(files["tweets"], 'r')
+    for batch in TweetAnalyzer.chunk_tweets(TweetAnalyzer.read_tweets(f), BATCH_SIZE):
+        if geo:
+            TweetAnalyzer.add_geo(batch)
+        if scored:
+            TweetAnalyzer.assign_sentiments(batch, sentiments)
+        yield batch
+    f.close()
+
+
+def line_batches(files):
+    """Generate the lines of the benchmark file BATCH_SIZE at a time"""
+    f = open(files["tweets"], 'r')
+    for batch in TweetAnalyzer.chunk_tweets(f, BATCH_SIZE):
+        yield batch
+    f.close()
+
+
+def load(files, geo=False, scored=False):
+    """Return the first CORPUS_LIMIT tweets of the benchmark file as a list,
+    for the stages that work on every tweet at once"""
+    tweets = []
+    for batch in batches(files, geo, scored):
+        tweets.extend(batch[:CORPUS_LIMIT - len(tweets)])
+        if len(tweets) >= CORPUS_LIMIT:
+            break
+    return tweets
+
+
+def stage_parse_make_tweet(files, timer):
+    for batch in line_batches(files):
+        timer.time(lambda lines: [TweetAnalyzer.make_tweet(line) for line in lines], batch)
+
+
+def stage_parse_tweet(files, timer):
+    # Only the parsing, comparable to parse_make_tweet, see tokenize
+    for batch in line_batches(files):
+        timer.time(lambda lines: [TweetAnalyzer.parse_tweet(line) for line in lines], batch)
+
+
+def stage_tokenize(files, timer):
+    for batch in line_batches(files):
+        tweets = [TweetAnalyzer.parse_tweet(line) for line in batch]
+        timer.time(lambda tweets: [TweetAnalyzer.add_words(tweet) for tweet in tweets], tweets)
+
+
+def stage_geo_brute(files, timer):
+    tweets = []
+    for batch in batches(files):
+        tweets.extend(batch[:BRUTE_LIMIT - len(tweets)])
+        if len(tweets) >= BRUTE_LIMIT:
+            break
+    TweetAnalyzer.load_gazetteer()
+    for tweet in tweets:
+        timer.time(lambda batch: TweetAnalyzer.add_geo(batch, "brute"), [tweet])
+
+
+def stage_geo_index(files, timer):
+    TweetAnalyzer.load_gazetteer().index
+    for batch in batches(files):
+        timer.time(lambda batch: TweetAnalyzer.add_geo(batch, "index"), batch)
+
+
+def stage_geo_grid(files, timer):
+    TweetAnalyzer.load_gazetteer().grid
+    for batch in batches(files):
+        timer.time(lambda batch: TweetAnalyzer.add_geo(batch, "grid"), batch)
+
+
+def stage_geo_numpy(files, timer):
+    TweetAnalyzer.load_gazetteer()
+    for batch in batches(files):
+        timer.time(lambda batch: TweetAnalyzer.add_geo(batch, "numpy"), batch)
+
+
+def stage_score_python(files, timer):
+    lexicon = TweetAnalyzer.compile_sentiments(TweetAnalyzer.create_sentiment_database(files["lexicon"]))
+    for batch in batches(files):
+        timer.time(lambda batch: TweetAnalyzer.assign_sentiments(batch, lexicon, "python"), batch)
+
+
+def stage_score_numpy(files, timer):
+    lexicon = TweetAnalyzer.compile_sentiments(TweetAnalyzer.create_sentiment_database(files["lexicon"]))
+    # The numpy engine scores tweet tables, lists of tweets go to the python one
+    for batch in batches(files):
+        timer.time(lambda table: TweetAnalyzer.assign_sentiments(table, lexicon, "numpy"),
+                   TweetAnalyzer.TweetTable(batch))
+
+
+def stage_word_index(files, timer):
+    tweets = load(files)
+    timer.time(TweetAnalyzer.index_tweets, tweets)
+
+
+def stage_filter_scan(files, timer):
+    tweets = load(files)
+    words = [TweetAnalyzer.tweet_words(tweet)[0] for tweet in tweets[:FILTER_WORDS] if TweetAnalyzer.tweet_words(tweet)]
+    for word in words:
+        timer.time(lambda batch: TweetAnalyzer.tweet_filter(batch, word=word), tweets, 1)
+
+
+def stage_filter_index(files, timer):
+    tweets = TweetAnalyzer.index_tweets(load(files))
+    words = [TweetAnalyzer.tweet_words(tweet)[0] for tweet in tweets[:FILTER_WORDS] if TweetAnalyzer.tweet_words(tweet)]
+    for word in words:
+        timer.time(lambda batch: TweetAnalyzer.tweet_filter(batch, word=word), tweets, 1)
+
+
+def stage_rank(files, timer):
+    tweets = TweetAnalyzer.index_tweets(load(files, geo=True, scored=True))
+    words = [TweetAnalyzer.tweet_words(tweet)[0] for tweet in tweets[:FILTER_WORDS] if TweetAnalyzer.tweet_words(tweet)]
+    for word in words:
+        timer.time(lambda batch: (TweetAnalyzer.most_positive(batch, word),
+                                  TweetAnalyzer.most_negative(batch, word)), tweets, 1)
+
+
+def stage_end_to_end(files, timer):
+    # Compiled once like the command line does, not for every batch
+    sentiments = TweetAnalyzer.compile_sentiments(TweetAnalyzer.create_sentiment_database(files["lexicon"]))
+    TweetAnalyzer.load_gazetteer()
+    out = open(os.devnull, 'w')
+    for batch in line_batches(files):
+        timer.time(lambda lines: TweetAnalyzer.write_tweets(TweetAnalyzer.analyze_tweets(lines, sentiments), out),
+                   batch)
+    out.close()
+
+
+# Every stage, in the order they run
+STAGES = [("parse_make_tweet", stage_parse_make_tweet), ("parse_tweet", stage_parse_tweet),
+          ("tokenize", stage_tokenize),
+          ("geo_brute", stage_geo_brute), ("geo_index", stage_geo_index), ("geo_grid", stage_geo_grid),
+          ("geo_numpy", stage_geo_numpy),
+          ("score_python", stage_score_python), ("score_numpy", stage_score_numpy),
+          ("word_index", stage_word_index), ("filter_scan", stage_filter_scan), ("filter_index", stage_filter_index),
+          ("rank", stage_rank), ("end_to_end", stage_end_to_end)]
+
+
+def peak_rss_mb():
+    """Return the peak resident memory of this process in megabytes"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    if sys.platform == "darwin":
+        return peak / (1024.0 * 1024.0)
+    return peak / 1024.0
+
+
+def _run_stage(stage, files, results):
+    """Run one stage in a child process and send back its report"""
+    timer = Timer()
+    before = peak_rss_mb()
+    stage(files, timer)
+    report = timer.report()
+    report["peak_rss_mb"] = peak_rss_mb()
+    report["start_rss_mb"] = before
+    results.put(report)
+
+
+def run_stage(stage, files):
+    """Return the report of a stage, run in a fresh process so the memory
+    of one stage doesn't count towards the next"""
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    process = context.Process(target=_run_stage, args=(stage, files, results))
+    process.start()
+    report = results.get()
+    process.join()
+    return report
+
+
+def run_benchmarks(args, stages, workdir, numpy):
+    """Generate the synthetic files in workdir and return the results of
+    running the stages on each size of file"""
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(args.vocabulary, rng)
+    files = {"lexicon": os.path.join(workdir, "lexicon.csv")}
+    generate_lexicon(files["lexicon"], vocabulary, rng)
+    results = {"python": platform.python_version(), "numpy": numpy and numpy.__version__,
+               "platform": platform.platform(), "seed": args.seed, "vocabulary": args.vocabulary, "runs": []}
+    for size in [int(size) for size in args.sizes.split(",")]:
+        files["tweets"] = os.path.join(workdir, "tweets_%d.txt" % size)
+        if not os.path.exists(files["tweets"]):
+            generate_tweets(files["tweets"], size, vocabulary, random.Random(args.seed + size))
+        run = {"size": size, "stages": {}}
+        for name, stage in stages:
+            run["stages"][name] = run_stage(stage, files)
+            sys.stderr.write("%d tweets, %s: %.3f s\n" % (size, name, run["stages"][name]["seconds"]))
+        results["runs"].append(run)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark each stage of TweetAnalyzer.")
+    parser.add_argument("--sizes", default="1000,10000",
+                        help="comma separated numbers of tweets to benchmark with")
+    parser.add_argument("--stages", default=",".join(name for name, stage in STAGES),
+                        help="comma separated stages to run")
+    parser.add_argument("--vocabulary", type=int, default=5000, help="number of different words")
+    parser.add_argument("--seed", type=int, default=1, help="seed for the synthetic data")
+    parser.add_argument("--workdir", help="directory for the synthetic files, a temporary one by default")
+    parser.add_argument("--output", default="-", help="file to write the JSON results to")
+    args = parser.parse_args(argv)
+    names = args.stages.split(",")
+    stages = [(name, stage) for name, stage in STAGES if name in names]
+    numpy = TweetAnalyzer.load_numpy()
+    if numpy is None:
+        stages = [(name, stage) for name, stage in stages if not name.endswith("numpy")]
+    workdir = args.workdir or tempfile.mkdtemp(prefix="tweet_benchmark")
+    if not os.path.isdir(workdir):
+        os.makedirs(workdir)
+    try:
+        results = run_benchmarks(args, stages, workdir, numpy)
+    finally:
+        # A temporary directory is only kept for the length of the run
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if args.output == "-":
+        sys.stdout.write(text + "\n")
+    else:
+        f = open(args.output, 'w')
+        f.write(text + "\n")
+        f.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The tests import TweetAnalyzer from the directory above, wherever they are
+# run from
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,310 @@
+"""Checks that the faster ways TweetAnalyzer has of doing each step give the
+same results as the simple ones they replaced. The tweets are made up with a
+fixed seed, most of them around the zip codes in zips.csv"""
+from datetime import datetime, timedelta
+import io
+import pickle
+import random
+
+import pytest
+
+import TweetAnalyzer
+
+# Words the made up tweets are written with, some of them in the lexicon
+WORDS = ["good", "bad", "not", "happy", "sad", "love", "can't", "wait", "the", "monday", "great", "school"]
+
+# A lexicon with phrases as well as single words
+LEXICON = "good,0.5\nbad,-0.5\nnot good,-0.625\nhappy,0.75\nsad,-0.25\nlove,0.625\ncan't wait,0.8\ngreat,0.4\n"
+
+
+def make_lines(count, seed=1, outside=0.2):
+    """Return count tweet lines formatted as in all_tweets.txt, the fraction
+    outside are anywhere in the world and the others near a zip code"""
+    rng = random.Random(seed)
+    gazetteer = TweetAnalyzer.load_gazetteer()
+    start = datetime(2011, 8, 1)
+    lines = []
+    for line in range(count):
+        if rng.random() < outside:
+            lat = rng.uniform(-60, 75)
+            lon = rng.uniform(-180, 180)
+        else:
+            position = rng.randrange(len(gazetteer))
+            lat = gazetteer.lats[position] + rng.gauss(0, 0.05)
+            lon = gazetteer.lons[position] + rng.gauss(0, 0.05)
+        posted = start + timedelta(seconds=rng.randrange(14 * 24 * 3600))
+        words = [rng.choice(WORDS) for word in range(rng.randint(1, 12))]
+        text = " ".join(words).capitalize() + rng.choice(["", "!", " :)", " café naïve"])
+        lines.append("[%f, %f]\t6\t%s\t%s\n" % (lat, lon, posted.strftime("%Y-%m-%d %H:%M:%S"), text))
+    return lines
+
+
+def as_text(tweets):
+    """Return the tweets the way write_tweets writes them"""
+    out = io.StringIO()
+    TweetAnalyzer.write_tweets(tweets, out)
+    return out.getvalue()
+
+
+def analyzed_tweets(lexicon_file, count, seed, outside=0.2):
+    """Return count made up tweets, geocoded and scored"""
+    sentiments = TweetAnalyzer.load_sentiments(lexicon_file)
+    return list(TweetAnalyzer.analyze_tweets(make_lines(count, seed, outside), sentiments))
+
+
+@pytest.fixture
+def lexicon_file(tmp_path):
+    path = tmp_path / "sentiments.csv"
+    path.write_text(LEXICON)
+    return str(path)
+
+
+@pytest.mark.parametrize("engine", ["index", "grid", "numpy"])
+def test_geo_engines_match_brute(engine):
+    if engine == "numpy" and TweetAnalyzer.load_numpy() is None:
+        pytest.skip("NumPy is not installed")
+    tweets = [TweetAnalyzer.parse_tweet(line) for line in make_lines(60, seed=2, outside=0.3)]
+    expected = TweetAnalyzer.add_geo([dict(tweet) for tweet in tweets], "brute")
+    found = TweetAnalyzer.add_geo([dict(tweet) for tweet in tweets], engine)
+    assert [(tweet["zip"], tweet["state"]) for tweet in found] == \
+        [(tweet["zip"], tweet["state"]) for tweet in expected]
+
+
+def test_parse_tweet_matches_make_tweet():
+    for line in make_lines(500):
+        assert TweetAnalyzer.parse_tweet(line) == TweetAnalyzer.make_tweet(line)
+
+
+def test_bad_locations_are_counted_as_malformed(lexicon_file):
+    lines = make_lines(20, seed=5)
+    for location in ("nan, 5", "1, inf", "-inf, 3", "91, 0", "0, 180.5"):
+        lines.append("[%s]\t6\t2011-08-02 10:00:00\tGood\n" % location)
+    counts = {"parsed": 0, "malformed": 0}
+    tweets = list(TweetAnalyzer.analyze_tweets(lines, TweetAnalyzer.load_sentiments(lexicon_file), counts=counts))
+    assert len(tweets) == 20
+    assert counts == {"parsed": 20, "malformed": 5}
+
+
+@pytest.mark.parametrize("newline", ["\n", "\r\n"])
+def test_workers_match_single_process(tmp_path, lexicon_file, newline):
+    sentiments = TweetAnalyzer.load_sentiments(lexicon_file)
+    infile = tmp_path / "tweets.txt"
+    with open(str(infile), "w", newline="") as f:
+        f.write("".join(line.replace("\n", newline) for line in make_lines(900, seed=9)))
+    single = str(tmp_path / "single.txt")
+    parallel = str(tmp_path / "parallel.txt")
+    TweetAnalyzer.analyze_file(str(infile), sentiments, single, chunk_size=100)
+    TweetAnalyzer.analyze_file(str(infile), sentiments, parallel, chunk_size=100, workers=3)
+    with open(single) as f:
+        expected = f.read()
+    with open(parallel) as f:
+        assert f.read() == expected
+    # The parts written by the workers are removed once they are joined
+    assert not [path for path in tmp_path.iterdir() if ".part" in path.name]
+
+
+def test_workers_keep_counts_and_stats_apart(tmp_path, lexicon_file):
+    sentiments = TweetAnalyzer.load_sentiments(lexicon_file)
+    infile = tmp_path / "tweets.txt"
+    infile.write_text("".join(make_lines(900, seed=9)) + "not a tweet\n")
+    results = []
+    for workers in (1, 3):
+        counts = {}
+        stats = TweetAnalyzer.PipelineStats()
+        TweetAnalyzer.analyze_file(str(infile), sentiments, str(tmp_path / "out.txt"), chunk_size=100,
+                                   counts=counts, workers=workers, stats=stats)
+        results.append((counts, stats.counters["kept"], "parsed" in stats.counters))
+        # With the stats as the counts, as the command line does, they are
+        # only counted once
+        stats = TweetAnalyzer.PipelineStats()
+        TweetAnalyzer.analyze_file(str(infile), sentiments, str(tmp_path / "out.txt"), chunk_size=100,
+                                   counts=stats.counters, workers=workers, stats=stats)
+        assert (stats.counters["parsed"], stats.counters["malformed"]) == (counts["parsed"], counts["malformed"])
+    assert results[0] == results[1] == ({"parsed": 900, "malformed": 1}, results[0][1], False)
+
+
+def test_scoring_engines_match(lexicon_file):
+    sentiments = TweetAnalyzer.create_sentiment_database(lexicon_file)
+    tweets = [TweetAnalyzer.add_words(TweetAnalyzer.parse_tweet(line)) for line in make_lines(500, seed=4)]
+    expected = [tweet["sentiment"] for tweet in
+                TweetAnalyzer.assign_sentiments([dict(tweet) for tweet in tweets], sentiments, "python")]
+    found = TweetAnalyzer.assign_sentiments([dict(tweet) for tweet in tweets], sentiments, "numpy")
+    assert [tweet["sentiment"] for tweet in found] == expected
+    table = TweetAnalyzer.assign_sentiments(TweetAnalyzer.TweetTable(tweets), sentiments, "numpy")
+    assert [tweet["sentiment"] for tweet in table] == expected
+
+
+def test_table_file_round_trip(tmp_path, lexicon_file):
+    sentiments = TweetAnalyzer.load_sentiments(lexicon_file)
+    tweets = list(TweetAnalyzer.analyze_tweets(make_lines(400, seed=6), sentiments))
+    path = str(tmp_path / "tweets.tt")
+    assert TweetAnalyzer.write_tweet_table(tweets, path) == len(tweets)
+    assert as_text(TweetAnalyzer.read_tweet_table(path)) == as_text(tweets)
+
+
+def test_cached_matches_uncached(tmp_path, lexicon_file):
+    sentiments = TweetAnalyzer.load_sentiments(lexicon_file)
+    lines = make_lines(600, seed=7)
+    expected = as_text(TweetAnalyzer.analyze_tweets(lines, sentiments, chunk_size=200))
+    cache = TweetAnalyzer.ResultsCache(str(tmp_path / "cache"))
+    assert as_text(TweetAnalyzer.analyze_tweets(lines, sentiments, chunk_size=200, cache=cache)) == expected
+    assert cache.misses == 3
+    assert as_text(TweetAnalyzer.analyze_tweets(lines, sentiments, chunk_size=200, cache=cache)) == expected
+    assert cache.hits == 3
+
+
+def test_geo_memo_matches_plain_geocoding():
+    lines = make_lines(300, seed=3)
+    # Repeat some of the locations, like a user tweeting from one place
+    lines += lines[:100]
+    tweets = [TweetAnalyzer.parse_tweet(line) for line in lines]
+    memo = TweetAnalyzer.GeoMemo()
+    found = TweetAnalyzer.add_geo([dict(tweet) for tweet in tweets], "index", memo)
+    assert found == TweetAnalyzer.add_geo([dict(tweet) for tweet in tweets], "index")
+    assert memo.hits >= 100
+
+
+def test_cache_keeps_memo_precision_apart(tmp_path, lexicon_file):
+    sentiments = TweetAnalyzer.load_sentiments(lexicon_file)
+    lines = make_lines(600, seed=8)
+    expected = as_text(TweetAnalyzer.analyze_tweets(lines, sentiments))
+    cache = TweetAnalyzer.ResultsCache(str(tmp_path / "cache"))
+    rounded = as_text(TweetAnalyzer.analyze_tweets(lines, sentiments, cache=cache,
+                                                   memo=TweetAnalyzer.GeoMemo(precision=0)))
+    assert rounded != expected
+    found = as_text(TweetAnalyzer.analyze_tweets(lines, sentiments, cache=cache, memo=TweetAnalyzer.GeoMemo()))
+    assert found == expected
+
+
+def test_compiled_lexicon_matches_csv(lexicon_file):
+    sentiments = TweetAnalyzer.create_sentiment_database(lexicon_file)
+    tweets = [TweetAnalyzer.add_words(TweetAnalyzer.parse_tweet(line)) for line in make_lines(300, seed=5)]
+    expected = TweetAnalyzer.assign_sentiments([dict(tweet) for tweet in tweets], sentiments, "python")
+    # The first load reads the csv and writes the compiled file
+    version = TweetAnalyzer.load_sentiments(lexicon_file).version
+    compiled = TweetAnalyzer.read_lexicon_cache(lexicon_file, lexicon_file + ".lexicon")
+    # The version and single words come from the file without making dictionaries
+    assert compiled.version == version
+    assert [compiled[word] for word in sentiments] == list(sentiments.values())
+    assert "missing" not in compiled and len(compiled) == len(sentiments)
+    assert compiled._codes is None and compiled._sentiments is None
+    found = TweetAnalyzer.assign_sentiments([dict(tweet) for tweet in tweets], compiled)
+    assert found == expected
+    assert pickle.loads(pickle.dumps(compiled)).sentiments == sentiments
+
+
+def test_phrases_scored_by_every_engine(lexicon_file):
+    sentiments = TweetAnalyzer.create_sentiment_database(lexicon_file)
+    texts = ["Not good at all", "Can't wait to see you", "Good not good", "Not not good", "Not happy"]
+    lines = ["[40.7, -74.0]\t6\t2011-08-02 10:00:00\t%s\n" % text for text in texts]
+    tweets = [TweetAnalyzer.add_words(TweetAnalyzer.parse_tweet(line)) for line in lines]
+    expected = [-0.625, 0.8, 0.5 - 0.625, -0.625, 0.75]
+    for engine in ("python", "numpy"):
+        found = TweetAnalyzer.assign_sentiments([dict(tweet) for tweet in tweets], sentiments, engine)
+        assert [tweet["sentiment"] for tweet in found] == expected
+    table = TweetAnalyzer.assign_sentiments(TweetAnalyzer.TweetTable(tweets), sentiments, "numpy")
+    assert [tweet["sentiment"] for tweet in table] == expected
+
+
+@pytest.mark.parametrize("key", ["state", "zip"])
+def test_top_sentiments_match_a_full_sort(lexicon_file, key):
+    tweets = analyzed_tweets(lexicon_file, 3000, seed=24, outside=0.3)
+    assert any(tweet[key] == "N/A" for tweet in tweets)
+    for word in (None, "good"):
+        # Every group worked out from a scan of the tweets
+        stats = {}
+        for tweet in tweets:
+            if tweet[key] == "N/A" or (word is not None and word not in TweetAnalyzer.tweet_words(tweet)):
+                continue
+            total, scored, count = stats.get(tweet[key], (0, 0, 0))
+            if tweet["sentiment"] is not None:
+                total += tweet["sentiment"]
+                scored += 1
+            stats[tweet[key]] = (total, scored, count + 1)
+        for min_count in (1, 3):
+            rows = [(group, total / scored, scored, count) for group, (total, scored, count) in stats.items()
+                    if scored >= min_count]
+            # Ties go to the group that sorts first
+            top = sorted(rows, key=lambda row: (-row[1], row[0]))[:5]
+            bottom = sorted(rows, key=lambda row: (row[1], row[0]))[:5]
+            for corpus in (tweets, TweetAnalyzer.TweetTable(tweets)):
+                assert TweetAnalyzer.top_sentiments(corpus, 5, word, key, min_count) == (top, bottom)
+
+
+def test_word_index_matches_a_scan(lexicon_file):
+    tweets = analyzed_tweets(lexicon_file, 2000, seed=17)
+    indexed = TweetAnalyzer.index_tweets(tweets)
+    for words in ([], ["good"], ["good", "not"], ["can't", "wait", "the"], ["happy", "missing"], ["missing"]):
+        assert TweetAnalyzer.find_tweets_containing_all(words, indexed) == \
+            [tweet for tweet in tweets if all(word in TweetAnalyzer.tweet_words(tweet) for word in words)]
+        assert TweetAnalyzer.find_tweets_containing_any(words, indexed) == \
+            [tweet for tweet in tweets if any(word in TweetAnalyzer.tweet_words(tweet) for word in words)]
+        assert TweetAnalyzer.tweet_filter(indexed, all_words=words, any_words=["sad", "love"], state="CA") == \
+            TweetAnalyzer.tweet_filter(tweets, all_words=words, any_words=["sad", "love"], state="CA")
+
+
+def loop_most_positive(tweets, word):
+    """most_positive as it was, one filter of the tweets per state"""
+    highestsentiment = 0
+    statename = ""
+    for state in TweetAnalyzer.create_state_database(TweetAnalyzer.STATES_FILE):
+        filtered = TweetAnalyzer.tweet_filter(tweets, word=word, state=state)
+        if filtered and TweetAnalyzer.find_average_sentiment(filtered) > highestsentiment:
+            highestsentiment = TweetAnalyzer.find_average_sentiment(filtered)
+            statename = state
+    return statename
+
+
+def loop_most_negative(tweets, word):
+    """most_negative as it was, one filter of the tweets per state"""
+    lowestsentiment = 0
+    statename = ""
+    for state in TweetAnalyzer.create_state_database(TweetAnalyzer.STATES_FILE):
+        filtered = TweetAnalyzer.tweet_filter(tweets, word=word, state=state)
+        if filtered and TweetAnalyzer.find_average_sentiment(filtered) < lowestsentiment:
+            lowestsentiment = TweetAnalyzer.find_average_sentiment(filtered)
+            statename = state
+    return statename
+
+
+@pytest.mark.parametrize("values", [(0.5, -0.5, None), (0.5, 0.0, None), (-0.5, 0.0, None), (0.0, None)])
+def test_most_positive_and_negative_match_the_loops(lexicon_file, values):
+    # Few tweets per state and a few sentiment values make ties likely, and
+    # without positive or negative values the 0 baseline leaves no state
+    tweets = analyzed_tweets(lexicon_file, 400, seed=23, outside=0.1)
+    rng = random.Random(23)
+    for tweet in tweets:
+        tweet["sentiment"] = rng.choice(values)
+    for word in ("good", "the", "school", "missing"):
+        assert TweetAnalyzer.most_positive(tweets, word) == loop_most_positive(tweets, word)
+        assert TweetAnalyzer.most_negative(tweets, word) == loop_most_negative(tweets, word)
+
+
+def test_time_index_matches_a_scan(lexicon_file):
+    tweets = analyzed_tweets(lexicon_file, 2000, seed=19)
+    indexed = TweetAnalyzer.index_tweets(tweets)
+    times = sorted(set(TweetAnalyzer.tweet_time(tweet) for tweet in tweets))
+    bounds = [None, times[0], times[len(times) // 3], times[-1], times[-1] + timedelta(seconds=1),
+              datetime(2011, 8, 5, 12, 30)]
+    for start in bounds:
+        for end in bounds:
+            expected = [tweet for tweet in tweets
+                        if (start is None or TweetAnalyzer.tweet_time(tweet) >= start) and
+                        (end is None or TweetAnalyzer.tweet_time(tweet) < end)]
+            assert TweetAnalyzer.find_tweets_between(start, end, indexed) == expected
+            assert TweetAnalyzer.tweet_filter(indexed, since=start, until=end, word="good") == \
+                TweetAnalyzer.tweet_filter(tweets, since=start, until=end, word="good")
+
+
+def test_sentiment_trend_buckets(lexicon_file):
+    tweets = analyzed_tweets(lexicon_file, 2000, seed=20, outside=0.3)
+    trend = TweetAnalyzer.sentiment_trend(TweetAnalyzer.index_tweets(tweets), "week")
+    # Weeks start at midnight on Monday
+    assert all(start.weekday() == 0 and start.time() == datetime.min.time() for start, group, average, count in trend)
+    assert "N/A" not in [group for start, group, average, count in trend]
+    assert sum(count for start, group, average, count in trend) == \
+        len([tweet for tweet in tweets if tweet["state"] != "N/A"])
+    # A bucket of a day given in seconds is the same as a day
+    assert TweetAnalyzer.sentiment_trend(tweets, 86400) == TweetAnalyzer.sentiment_trend(tweets, "day")
+    with pytest.raises(ValueError):
+        TweetAnalyzer.sentiment_trend(tweets, "month")